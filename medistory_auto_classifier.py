@@ -5,24 +5,120 @@ Auteur: Assistant de développement
 Version: 1.0 - Prototype
 """
 
+import io
 import os
+import math
+import tempfile
 import time
+import itertools
+import multiprocessing
+from multiprocessing import shared_memory
 import re
 from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import pytesseract
 from PIL import Image
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 import pdf2image
-from difflib import get_close_matches
+import PyPDF2
 import sqlite3
+import hashlib
 import logging
+import threading
+import zlib
+try:
+    import tesserocr
+except ImportError:  # Moteur OCR résident indisponible: repli sur pytesseract
+    tesserocr = None
+from patient_index import (PatientMatcher, PatientStore, PatientFile, LookupCache,
+                           FtsPatientIndex, AliasStore, calculate_confidence, normalize_name,
+                           parse_dob, save_index, load_index)
 
 # Configuration
 WATCHED_FOLDER = "/Users/cabinet/Documents/Scans_Entrants"  # Dossier surveillé pour les nouveaux scans
 PROCESSED_FOLDER = "/Users/cabinet/Documents/Scans_Traites"
 MEDISTORY_IMPORT_FOLDER = "/Users/cabinet/Library/Application Support/Medistory/Import"  # À VÉRIFIER
 LOG_FILE = "/Users/cabinet/Documents/medistory_classifier.log"
+PATIENT_LIST_FILE = "/Users/cabinet/Documents/liste_patients.txt"  # Si accès BDD impossible
+
+# Index patients persistant (redémarrage sans reconstruction), None pour désactiver
+INDEX_CACHE_FILE = "/Users/cabinet/Documents/medistory_patients.idx"
+# Délai minimum entre deux réécritures de l'index après un rafraîchissement (secondes)
+INDEX_SAVE_INTERVAL = 600
+
+# Index patients: "memory" (index en mémoire, voir INDEX_CACHE_FILE) ou "fts"
+# (base SQLite FTS5 locale: mémoire constante, partageable entre processus)
+PATIENT_BACKEND = "memory"
+FTS_INDEX_FILE = "/Users/cabinet/Documents/medistory_patients_fts.db"
+
+# PDF contenant déjà du texte (résultats électroniques, scanners avec OCR):
+# lecture directe de la couche texte, sans rendu ni OCR
+PDF_TEXT_LAYER = True
+PDF_TEXT_MIN_CHARS = 40  # En dessous, couche texte jugée vide ou inexploitable
+
+# OCR progressif: bande d'en-tête (fraction de la hauteur de page) lue en
+# premier, page entière seulement si aucun nom n'y est trouvé (None pour désactiver)
+OCR_HEADER_FRACTION = 0.33
+
+# Cascade de résolutions OCR (DPI, niveaux de gris): la page est d'abord lue
+# à basse résolution, puis rendue à nouveau à la résolution suivante si aucun
+# nom n'est trouvé ou si la confiance reste sous CONFIDENCE_THRESHOLD
+OCR_DPI_TIERS = (150, 300)
+SCAN_DEFAULT_DPI = 300  # Résolution supposée d'une image sans métadonnée DPI
+
+# Seuil de confiance pour l'identification patient (0.0 à 1.0)
+CONFIDENCE_THRESHOLD = 0.8
+
+# Moteur OCR: "tesserocr" (libtesseract chargée une fois par processus, modèle
+# "fra" résident, images passées en mémoire), "pytesseract" (un processus
+# tesseract par image) ou "auto" (tesserocr s'il est installé)
+OCR_BACKEND = "auto"
+
+# Processus OCR en parallèle (rendu et Tesseract), 0 pour traiter les
+# documents un par un dans le processus principal
+OCR_WORKERS = os.cpu_count() or 1
+OCR_WORKER_MAX_TASKS = 50  # Pages lues avant recyclage d'un processus (fuites mémoire)
+OCR_TASK_TIMEOUT = 120  # Secondes avant abandon d'une page
+# Processus de rendu des pages (pdf2image) alimentant les processus OCR par
+# mémoire partagée: le rendu du document suivant chevauche l'OCR du précédent
+# (0: rendu et OCR enchaînés dans le même processus)
+OCR_RENDER_WORKERS = max(1, OCR_WORKERS // 4) if OCR_WORKERS > 1 else 0
+# Documents déjà présents au démarrage: pages lues par lots, un seul appel
+# tesseract (liste d'images) pour OCR_BATCH_SIZE pages au plus
+OCR_BATCH_SIZE = 16
+
+# OCR mot à mot (confiance par mot), lu bloc par bloc dans l'ordre de lecture:
+# les mots sous OCR_MIN_WORD_CONFIDENCE (traits, tampons, bruit) sont écartés
+# et la lecture s'arrête après « Patient : NOM Prénom » (tous ses mots au moins à
+# OCR_NAME_CONFIDENCE) et la date de naissance, au plus tard en fin de bande
+# d'en-tête (False: texte brut page par page)
+OCR_WORD_LEVEL = True
+OCR_MIN_WORD_CONFIDENCE = 40
+OCR_NAME_CONFIDENCE = 80
+
+# Cache persistant des textes OCR (empreinte du fichier, profil OCR, page):
+# un fichier redéposé est relu sans OCR; None pour désactiver
+OCR_CACHE_FILE = "/Users/cabinet/Documents/medistory_ocr_cache.db"
+OCR_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Taille des textes conservés (Mo × 1024²)
+
+# Colonne date de naissance de la table patients (ignorée si absente, None
+# pour ne pas la lire); sert à départager les homonymes
+PATIENT_DOB_COLUMN = "date_naissance"
+
+# Recherche patients: "ngram" (trigrammes), "bktree" (distance d'édition),
+# "phonetic" (clés phonétiques françaises) ou "tokens" (ordre des mots indifférent)
+MATCHING_MODE = "ngram"
+
+# Alias appris lors du classement manuel (resolve_alias.py), None pour désactiver
+ALIAS_DB_FILE = "/Users/cabinet/Documents/medistory_alias.db"
+
+# Nombre de recherches patients mémorisées (cache LRU)
+LOOKUP_CACHE_SIZE = 1024
+
+# Intervalle de vérification des nouveaux patients (secondes), 0 pour désactiver
+PATIENT_REFRESH_INTERVAL = 60
 
 # Configuration de logging
 logging.basicConfig(
@@ -34,6 +130,11 @@ logging.basicConfig(
     ]
 )
 
+def _patient_crc(*fields):
+    """CRC32 d'une ligne patient (empreinte des modifications de la base)"""
+    return zlib.crc32('\x1f'.join(map(str, fields)).encode('utf-8'))
+
+
 class PatientDatabase:
     """Gestion de la base de données des patients"""
     
@@ -47,6 +148,28 @@ class PatientDatabase:
         # TODO: Trouver le vrai chemin de la base Médistory
         self.db_path = db_path or "/Users/cabinet/Library/Application Support/Medistory/data.db"
         self.patients_cache = []
+        self.matcher = PatientMatcher([])
+        self.lookup_cache = LookupCache(LOOKUP_CACHE_SIZE)
+        self.aliases = None
+        if ALIAS_DB_FILE:
+            try:
+                self.aliases = AliasStore(ALIAS_DB_FILE)
+            except Exception as e:
+                logging.warning(f"Alias patients indisponibles: {e}")
+        # Index effectivement utilisé: PATIENT_BACKEND, sauf si SQLite n'a pas FTS5
+        self.backend = PATIENT_BACKEND
+        # Source chargée ("sqlite" ou "file") et état pour le rafraîchissement
+        self.source = None
+        self._columns = "id, nom, prenom"
+        self._refresh_conn = None
+        self._db_state = None
+        self._file_state = None
+        self._refresh_lock = threading.Lock()
+        self._refresh_stop = threading.Event()
+        self._refresh_thread = None
+        # Index rafraîchi pas encore réécrit sur disque: (matcher, signature)
+        self._pending_save = None
+        self._last_save = 0.0
         self.load_patients()
     
     def load_patients(self):
@@ -59,107 +182,1408 @@ class PatientDatabase:
         
         # OPTION 1: Si Médistory utilise SQLite
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            # Requête à adapter selon la vraie structure
-            cursor.execute("SELECT id, nom, prenom FROM patients")
-            self.patients_cache = cursor.fetchall()
-            conn.close()
+            # Connexion conservée pour détecter les changements (PRAGMA data_version)
+            conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+            try:
+                # Empreinte et lecture dans la même transaction (instantané cohérent)
+                conn.execute("BEGIN")
+                self._columns = self._patient_columns(conn)
+                state = self._read_database_state(conn)
+                signature = self._database_signature(state)
+                # Index persistant encore valide: pas de relecture de la base
+                cached = self.load_cached_index(signature)
+                if not cached:
+                    cursor = conn.cursor()
+                    # Requête à adapter selon la vraie structure
+                    cursor.execute(f"SELECT {self._columns} FROM patients")
+                    if self.backend == 'fts':
+                        # Lignes versées dans l'index FTS au fil de la lecture
+                        self.matcher = self._new_matcher(cursor, signature)
+                        self.patients_cache = self.matcher.patients
+                    else:
+                        self.patients_cache = cursor.fetchall()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.close()
+                raise
+            self._close_refresh_connection()
+            self._refresh_conn = conn
+            self._db_state = state
+            self.source = 'sqlite'
+            if cached:
+                return
             logging.info(f"{len(self.patients_cache)} patients chargés")
+            if self.backend == 'fts':
+                self.lookup_cache.clear()
+            else:
+                self.build_index(signature)
         except Exception as e:
             logging.error(f"Erreur chargement BDD: {e}")
             # FALLBACK: Charger depuis un fichier texte manuel
             self.load_from_file()
     
+    def _database_signature(self, state):
+        """
+        Empreinte du contenu de la table patients, enregistrée avec l'index
+        
+        La taille et la date du fichier ne suffisent pas (nom corrigé sans
+        changer la taille, base restaurée avec sa date): l'empreinte des
+        lignes calculée pour le rafraîchissement en fait partie.
+        
+        Args:
+            state: État lu par _read_database_state (dernier id et empreinte)
+        """
+        count, crc = state['fingerprint']
+        return f"sqlite:{self._columns}:{state['last_id']}:{count}:{crc:.0f}"
+    
+    def _patient_columns(self, conn):
+        """Colonnes lues dans la table patients (date de naissance si présente)"""
+        columns = "id, nom, prenom"
+        if PATIENT_DOB_COLUMN:
+            names = {row[1] for row in conn.execute("PRAGMA table_info(patients)")}
+            if PATIENT_DOB_COLUMN in names:
+                columns += f", {PATIENT_DOB_COLUMN}"
+        return columns
+    
+    def _read_database_state(self, conn, last_id=None):
+        """
+        État de la table patients pour détecter ajouts et modifications
+        
+        Args:
+            conn: Connexion SQLite (dans une transaction de lecture)
+            last_id: Dernier id déjà chargé (par défaut le plus grand id actuel)
+            
+        Returns:
+            dict: data_version, dernier id, et empreinte (nombre de lignes,
+                  somme des CRC) des patients jusqu'à ce dernier id
+        """
+        if last_id is None:
+            last_id = conn.execute("SELECT MAX(id) FROM patients").fetchone()[0] or 0
+        # Somme des CRC des lignes, calculée dans SQLite (rien n'est transféré)
+        conn.create_function("patient_crc", -1, _patient_crc, deterministic=True)
+        fingerprint = tuple(conn.execute(
+            f"SELECT COUNT(*), TOTAL(patient_crc({self._columns})) FROM patients WHERE id <= ?",
+            (last_id,)
+        ).fetchone())
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        return {'data_version': data_version, 'last_id': last_id, 'fingerprint': fingerprint}
+    
+    def _close_refresh_connection(self):
+        if self._refresh_conn is not None:
+            self._refresh_conn.close()
+            self._refresh_conn = None
+    
+    def build_index(self, signature=None):
+        """
+        Construire l'index de recherche à partir du cache patients
+        
+        Args:
+            signature: Empreinte de la source, pour sauvegarder l'index sur disque
+        """
+        start = time.perf_counter()
+        self.matcher = self._new_matcher(self.patients_cache, signature)
+        self.patients_cache = self.matcher.patients
+        self.lookup_cache.clear()
+        elapsed = time.perf_counter() - start
+        logging.info(f"Index patients construit en {elapsed:.2f}s")
+        
+        if signature and INDEX_CACHE_FILE and self.backend != 'fts':
+            self._pending_save = (self.matcher, signature)
+            self.save_pending_index(force=True)
+    
+    def save_pending_index(self, force=False):
+        """
+        Réécrire l'index persistant après un rafraîchissement
+        
+        Les rafraîchissements successifs ne réécrivent pas tout le fichier à
+        chaque fois: au plus une écriture toutes les INDEX_SAVE_INTERVAL
+        secondes, la dernière à l'arrêt (stop_refresher).
+        
+        Args:
+            force: Écrire sans attendre la fin du délai
+        """
+        if self._pending_save is None:
+            return
+        if not force and time.monotonic() - self._last_save < INDEX_SAVE_INTERVAL:
+            return
+        matcher, signature = self._pending_save
+        self._pending_save = None
+        self._last_save = time.monotonic()
+        try:
+            save_index(matcher, INDEX_CACHE_FILE, signature)
+        except Exception as e:
+            logging.warning(f"Index patients non sauvegardé: {e}")
+    
+    def _new_matcher(self, patients, signature=None):
+        """
+        Construire l'index de recherche selon PATIENT_BACKEND
+        
+        Args:
+            patients: Tuples (id, nom, prenom), liste ou curseur SQL
+            signature: Empreinte de la source (enregistrée dans l'index FTS)
+        """
+        if self.backend == 'fts':
+            # Index FTS partagé: reconstruit sur place, en une transaction
+            index = self.matcher
+            if not isinstance(index, FtsPatientIndex):
+                index = self._open_fts_index()
+            if index is not None:
+                return index.rebuild(patients, signature)
+        # Stockage compact (un tampon texte) au lieu d'une liste de tuples
+        if not isinstance(patients, PatientStore):
+            patients = PatientStore(patients)
+        return PatientMatcher(patients, mode=MATCHING_MODE)
+    
+    def _open_fts_index(self):
+        """
+        Ouvrir l'index FTS_INDEX_FILE
+        
+        Returns:
+            FtsPatientIndex, ou None si SQLite ne connaît pas FTS5 ou le
+            tokenizer trigram (SQLite < 3.34): l'index en mémoire le remplace
+        """
+        try:
+            return FtsPatientIndex(FTS_INDEX_FILE)
+        except sqlite3.OperationalError as e:
+            logging.warning(f"Index FTS indisponible avec SQLite {sqlite3.sqlite_version} ({e}): "
+                            f"index patients en mémoire")
+            self.backend = 'memory'
+            return None
+    
+    def load_cached_index(self, signature):
+        """
+        Charger l'index persistant s'il correspond toujours à la source
+        
+        Args:
+            signature: Empreinte actuelle de la base ou du fichier patients
+            
+        Returns:
+            bool: True si l'index a été chargé
+        """
+        start = time.perf_counter()
+        try:
+            # Index éventuellement construit par un autre processus
+            matcher = self._open_fts_index() if self.backend == 'fts' else None
+            if matcher is not None:
+                if matcher.signature != signature:
+                    # Périmé: sera reconstruit sur place (_new_matcher)
+                    self.matcher = matcher
+                    return False
+            elif INDEX_CACHE_FILE:
+                matcher = load_index(INDEX_CACHE_FILE, signature, mode=MATCHING_MODE)
+        except Exception as e:
+            logging.warning(f"Index patients illisible: {e}")
+            return False
+        if matcher is None:
+            return False
+        
+        self.matcher = matcher
+        self.patients_cache = matcher.patients
+        self.lookup_cache.clear()
+        elapsed = time.perf_counter() - start
+        logging.info(f"{len(self.patients_cache)} patients chargés depuis l'index "
+                     f"persistant en {elapsed * 1000:.0f} ms")
+        return True
+    
     def load_from_file(self):
         """Charger depuis un fichier texte si accès BDD impossible"""
-        patient_file = "/Users/cabinet/Documents/liste_patients.txt"
-        if os.path.exists(patient_file):
-            with open(patient_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    parts = line.strip().split(',')
-                    if len(parts) >= 3:
-                        self.patients_cache.append(tuple(parts))
+        patient_file = PATIENT_LIST_FILE
+        signature = None
+        if os.path.exists(patient_file) and not self.patients_cache:
+            stat = os.stat(patient_file)
+            digest = hashlib.sha256()
+            with open(patient_file, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+            signature = f"file:{digest.hexdigest()}"
+            # Seul un fichier chargé seul peut être rafraîchi
+            self._file_state = (stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+            self.source = 'file'
+            if self.load_cached_index(signature):
+                return
+        
+        if not os.path.exists(patient_file):
+            self.build_index(signature)
+            return
+        
+        # Lecture CSV en continu: les lignes alimentent directement l'index
+        start = time.perf_counter()
+        reader = PatientFile(patient_file)
+        self.patients_cache = itertools.chain(self.patients_cache, reader)
+        self.build_index(signature)
+        elapsed = time.perf_counter() - start
+        logging.info(
+            f"Fichier patients: {reader.rows} lignes en {elapsed:.2f}s "
+            f"({reader.rows / elapsed if elapsed else 0:.0f} lignes/s, {reader.encoding}, "
+            f"séparateur {reader.dialect.delimiter!r}, en-tête: {'oui' if reader.has_header else 'non'}"
+            f"{f', {reader.skipped} lignes ignorées' if reader.skipped else ''})"
+        )
+    
+    def start_refresher(self, interval=PATIENT_REFRESH_INTERVAL):
+        """
+        Lancer la vérification périodique des nouveaux patients en arrière-plan
+        
+        Les recherches continuent sur l'index courant pendant la mise à jour;
+        le nouvel index le remplace d'un bloc une fois construit.
+        
+        Args:
+            interval: Secondes entre deux vérifications (0 pour désactiver)
+        """
+        if not interval or self.source is None or self._refresh_thread is not None:
+            return
+        self._refresh_stop.clear()
+        self._refresh_thread = threading.Thread(
+            target=self._refresh_loop, args=(interval,),
+            name="patients-refresh", daemon=True
+        )
+        self._refresh_thread.start()
+        logging.info(f"Rafraîchissement des patients toutes les {interval}s")
+    
+    def stop_refresher(self):
+        """Arrêter la vérification périodique et écrire l'index en attente"""
+        if self._refresh_thread is not None:
+            self._refresh_stop.set()
+            self._refresh_thread.join()
+            self._refresh_thread = None
+        self.save_pending_index(force=True)
+    
+    def _refresh_loop(self, interval):
+        while not self._refresh_stop.wait(interval):
+            try:
+                self.refresh()
+                self.save_pending_index()
+            except Exception as e:
+                logging.error(f"Erreur rafraîchissement patients: {e}")
+    
+    def refresh(self):
+        """
+        Intégrer les patients ajoutés ou modifiés depuis le dernier chargement
+        
+        Vérification peu coûteuse d'abord (PRAGMA data_version pour SQLite,
+        taille et date pour le fichier texte); seuls les nouveaux patients
+        sont lus et indexés quand la source n'a fait que grandir.
+        
+        Returns:
+            bool: True si l'index a été remplacé
+        """
+        with self._refresh_lock:
+            if self.source == 'sqlite' and self._refresh_conn is not None:
+                return self._refresh_from_database()
+            if self.source == 'file' and self._file_state is not None:
+                return self._refresh_from_file()
+            return False
+    
+    def _refresh_from_database(self):
+        conn = self._refresh_conn
+        state = self._db_state
+        if conn.execute("PRAGMA data_version").fetchone()[0] == state['data_version']:
+            return False
+        
+        start = time.perf_counter()
+        conn.execute("BEGIN")
+        try:
+            current = self._read_database_state(conn, state['last_id'])
+            if current['fingerprint'] == state['fingerprint']:
+                # Patients déjà chargés inchangés: lecture des seuls ajouts
+                delta = conn.execute(
+                    f"SELECT {self._columns} FROM patients WHERE id > ? ORDER BY id",
+                    (state['last_id'],)
+                ).fetchall()
+                if not delta:
+                    self._db_state = current
+                    return False
+                matcher = self.matcher.extended(delta)
+                current = self._read_database_state(conn, delta[-1][0])
+                change = f"{len(delta)} nouveaux patients"
+            else:
+                # Suppression ou modification: reconstruction complète
+                current = self._read_database_state(conn)
+                rows = conn.execute(f"SELECT {self._columns} FROM patients")
+                matcher = self._new_matcher(rows, self._database_signature(current))
+                change = "base modifiée, index reconstruit"
+        finally:
+            conn.execute("COMMIT")
+        
+        self._db_state = current
+        self._swap_matcher(matcher, self._database_signature(current))
+        elapsed = time.perf_counter() - start
+        logging.info(f"Patients rafraîchis ({change}) en {elapsed:.2f}s: "
+                     f"{len(self.patients_cache)} patients")
+        return True
+    
+    def _refresh_from_file(self):
+        patient_file = PATIENT_LIST_FILE
+        size, mtime_ns, old_digest = self._file_state
+        if not os.path.exists(patient_file):
+            return False
+        stat = os.stat(patient_file)
+        if (stat.st_size, stat.st_mtime_ns) == (size, mtime_ns):
+            return False
+        
+        start = time.perf_counter()
+        with open(patient_file, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data[:size])
+        appended = (len(data) >= size and digest.hexdigest() == old_digest
+                    and (size == 0 or data[size - 1:size] == b'\n'))
+        digest.update(data[size:])
+        self._file_state = (len(data), stat.st_mtime_ns, digest.hexdigest())
+        if digest.hexdigest() == old_digest:
+            return False
+        
+        reader = PatientFile(patient_file)
+        if appended:
+            # Lignes ajoutées en fin de fichier: seules celles-ci sont indexées
+            lines = data[size:].decode(reader.encoding, errors='replace').splitlines()
+            patients = list(reader.parse(lines))
+            matcher = self.matcher.extended(patients)
+            change = f"{len(patients)} nouveaux patients"
+        else:
+            lines = io.StringIO(data.decode(reader.encoding, errors='replace'), newline='')
+            patients = reader.parse(lines, skip_header=reader.has_header)
+            matcher = self._new_matcher(patients, f"file:{digest.hexdigest()}")
+            change = "fichier modifié, index reconstruit"
+        
+        self._swap_matcher(matcher, f"file:{digest.hexdigest()}")
+        elapsed = time.perf_counter() - start
+        logging.info(f"Patients rafraîchis ({change}) en {elapsed:.2f}s: "
+                     f"{len(self.patients_cache)} patients")
+        return True
+    
+    def _swap_matcher(self, matcher, signature=None):
+        """
+        Remplacer l'index de recherche d'un bloc (affectation atomique)
+        
+        Args:
+            matcher: Nouvel index, entièrement construit
+            signature: Empreinte de la source, pour sauvegarder l'index sur disque
+        """
+        # Statistiques cumulées sur toute la durée de fonctionnement
+        matcher.stats = self.matcher.stats
+        self.matcher = matcher
+        self.patients_cache = matcher.patients
+        self.lookup_cache.clear()
+        
+        if signature and isinstance(matcher, FtsPatientIndex):
+            matcher.set_signature(signature)
+        elif signature and INDEX_CACHE_FILE:
+            # Écriture différée (save_pending_index): le fichier n'est pas
+            # réécrit en entier à chaque nouveau patient
+            self._pending_save = (matcher, signature)
     
-    def find_patient(self, name_text):
+    def find_patient(self, name_text, dob=None):
         """
         Trouver le patient correspondant au texte extrait
         
         Args:
             name_text: Texte brut contenant potentiellement un nom
+            dob: Date de naissance extraite du document (facultative)
             
         Returns:
             tuple: (patient_id, nom, prenom, score_confiance)
         """
-        # Nettoyer le texte
-        name_text = name_text.upper().strip()
+        candidates = self.find_candidates(name_text, k=1, dob=dob)
+        if not candidates:
+            return None
+        (patient_id, nom, prenom), confidence = candidates[0]
+        return (patient_id, nom, prenom, confidence)
+    
+    def find_candidates(self, name_text, k=3, dob=None, with_dob=False):
+        """
+        Trouver les k patients les plus proches du texte extrait
         
-        # Créer une liste de noms complets pour la recherche
-        patient_names = [f"{p[1]} {p[2]}" for p in self.patients_cache]
+        Args:
+            name_text: Texte brut contenant potentiellement un nom
+            k: Nombre maximum de candidats
+            dob: Date de naissance extraite du document (facultative)
+            with_dob: Ajouter à chaque candidat s'il est né ce jour
+            
+        Returns:
+            list: Couples ((patient_id, nom, prenom), score_confiance), ou
+                  triplets (..., né_ce_jour) avec with_dob, du meilleur au
+                  moins bon
+        """
+        # Index lu une seule fois: un rafraîchissement peut le remplacer
+        matcher = self.matcher
         
-        # Recherche floue avec fuzzy matching
-        matches = get_close_matches(name_text, patient_names, n=3, cutoff=0.6)
+        # Lecture OCR déjà corrigée à la main: résolution immédiate, si le
+        # patient existe toujours sous ce nom
+        if self.aliases is not None:
+            alias = self.aliases.get(name_text)
+            if alias is not None:
+                patient = matcher.find_by_id(alias[0], f"{alias[1]} {alias[2]}")
+                if patient is not None:
+                    return [(patient, 1.0, False)] if with_dob else [(patient, 1.0)]
         
-        if matches:
-            best_match = matches[0]
-            # Retrouver le patient correspondant
-            for patient in self.patients_cache:
-                if f"{patient[1]} {patient[2]}" == best_match:
-                    confidence = self._calculate_confidence(name_text, best_match)
-                    return (patient[0], patient[1], patient[2], confidence)
+        # "1/2/1950" et "01/02/1950" partagent la même entrée
+        dob = parse_dob(dob)
+        key = (normalize_name(name_text), k, dob)
+        # Résultat mémorisé avec l'index qui l'a produit: ignoré s'il a été remplacé
+        cached = self.lookup_cache.get(key, owner=matcher)
+        if cached is not None:
+            candidates = cached[1]
+        else:
+            candidates = matcher.find_candidates(name_text, k, dob, with_dob=True)
+            self.lookup_cache.put(key, (matcher, candidates))
+        if with_dob:
+            return list(candidates)
+        return [(patient, score) for patient, score, _ in candidates]
+    
+    def find_patients(self, names, k=1):
+        """
+        Trouver les patients de plusieurs documents en un seul passage
+        (retraitement d'un arriéré de scans)
         
-        return None
+        Args:
+            names: Liste de textes extraits
+            k: Nombre de candidats retournés par texte
+            
+        Returns:
+            list: Pour chaque texte, liste de couples (patient, score_confiance)
+        """
+        return self.matcher.find_batch(names, k)
     
     def _calculate_confidence(self, text1, text2):
         """Calculer un score de confiance entre deux chaînes"""
-        from difflib import SequenceMatcher
-        return SequenceMatcher(None, text1.upper(), text2.upper()).ratio()
+        return calculate_confidence(text1, text2)
+
+
+class PytesseractEngine:
+    """Moteur OCR pytesseract: un processus tesseract par image"""
+    
+    name = 'pytesseract'
+    # Toute l'image est reconnue en un appel, même si la lecture s'arrête tôt
+    incremental = False
+    
+    def image_to_string(self, image):
+        """
+        Reconnaître le texte d'une image
+        
+        pytesseract écrit l'image dans un fichier temporaire avant d'appeler
+        tesseract, en PNG par défaut: le format PNM brut (PGM pour le niveau
+        de gris) évite la compression puis la décompression de chaque page.
+        
+        Args:
+            image: Image PIL
+            
+        Returns:
+            str: Texte reconnu
+        """
+        if image.mode in ('1', 'L', 'RGB'):
+            image.format = 'PPM'
+        return pytesseract.image_to_string(image, lang='fra')
+    
+    def image_to_blocks(self, image):
+        """
+        Mots reconnus, regroupés par bloc et par ligne dans l'ordre de lecture
+        
+        Un seul appel tesseract pour toute l'image: les blocs sont découpés
+        après coup (voir OCR_HEADER_FRACTION pour limiter la surface lue).
+        
+        Args:
+            image: Image PIL
+            
+        Yields:
+            tuple: (ordonnée du haut du bloc, lignes du bloc), chaque ligne
+                   étant une liste de couples (mot, confiance 0-100)
+        """
+        if image.mode in ('1', 'L', 'RGB'):
+            image.format = 'PPM'
+        data = pytesseract.image_to_data(image, lang='fra', output_type=pytesseract.Output.DICT)
+        block, top, lines, line_key = None, 0, [], None
+        for i, word in enumerate(data['text']):
+            # Niveau 5: mot (les niveaux 1 à 4 décrivent page, bloc, paragraphe, ligne)
+            if data['level'][i] != 5 or not word.strip():
+                continue
+            if data['block_num'][i] != block:
+                if lines:
+                    yield top, lines
+                block, top, lines, line_key = data['block_num'][i], data['top'][i], [], None
+            key = (data['par_num'][i], data['line_num'][i])
+            if key != line_key:
+                lines.append([])
+                line_key = key
+            lines[-1].append((word, float(data['conf'][i])))
+        if lines:
+            yield top, lines
+    
+    def images_to_strings(self, images, timeout=0):
+        """
+        Reconnaître le texte de plusieurs images en un seul appel tesseract
+        
+        tesseract lit une liste de fichiers images et sépare le texte de
+        chaque page par un saut de page: le démarrage et le chargement du
+        modèle ne sont payés qu'une fois pour tout le lot.
+        
+        Args:
+            images: Images PIL
+            timeout: Durée maximale de l'appel (secondes, 0 pour illimitée)
+            
+        Returns:
+            list: Texte de chaque image, dans l'ordre
+        """
+        if len(images) < 2:
+            return [self.image_to_string(image) for image in images]
+        with tempfile.TemporaryDirectory(prefix='tess_batch_') as tmpdir:
+            paths = []
+            for i, image in enumerate(images):
+                path = os.path.join(tmpdir, f"page_{i:04d}.pgm")
+                image.convert('L').save(path, format='PPM')
+                paths.append(path)
+            list_path = os.path.join(tmpdir, "pages.txt")
+            with open(list_path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(paths) + '\n')
+            output_base = os.path.join(tmpdir, "texte")
+            pytesseract.pytesseract.run_tesseract(list_path, output_base, 'txt', 'fra',
+                                                  timeout=timeout)
+            with open(f"{output_base}.txt", 'r', encoding='utf-8') as f:
+                pages = f.read().split('\f')
+        # Une page par image, suivie d'un saut de page
+        if len(pages) != len(images) + 1:
+            logging.warning(f"Sortie tesseract par lot inattendue ({len(pages) - 1} pages "
+                            f"pour {len(images)} images), lecture image par image")
+            return [self.image_to_string(image) for image in images]
+        return pages[:-1]
+    
+    def close(self):
+        """Rien à libérer"""
+
+
+class TesserocrEngine:
+    """
+    Moteur OCR tesserocr: libtesseract chargée dans le processus
+    
+    Le modèle de langue est chargé une seule fois et reste en mémoire; les
+    images sont transmises sans fichier temporaire ni nouveau processus.
+    """
+    
+    name = 'tesserocr'
+    # Blocs reconnus un à un: la lecture peut s'arrêter avant la fin de la page
+    incremental = True
+    
+    def __init__(self, lang='fra'):
+        self.api = tesserocr.PyTessBaseAPI(lang=lang)
+        # Une instance libtesseract ne supporte pas les appels concurrents
+        self.lock = threading.Lock()
+    
+    def image_to_string(self, image):
+        """
+        Reconnaître le texte d'une image
+        
+        Args:
+            image: Image PIL
+            
+        Returns:
+            str: Texte reconnu
+        """
+        with self.lock:
+            self.api.SetImage(image)
+            return self.api.GetUTF8Text()
+    
+    def image_to_blocks(self, image):
+        """
+        Mots reconnus, bloc par bloc dans l'ordre de lecture
+        
+        L'analyse de mise en page (rapide) découpe l'image en blocs; chaque
+        bloc n'est reconnu que lorsque ses lignes sont parcourues, si bien
+        qu'un appelant qui s'arrête au bloc du nom (ou d'après la position
+        du bloc suivant) ne paie pas la reconnaissance du reste.
+        
+        Args:
+            image: Image PIL
+            
+        Yields:
+            tuple: (ordonnée du haut du bloc, lignes du bloc), chaque ligne
+                   étant une liste de couples (mot, confiance 0-100)
+        """
+        with self.lock:
+            self.api.SetImage(image)
+            for _, box, _, _ in self.api.GetComponentImages(tesserocr.RIL.BLOCK, True):
+                yield box['y'], self._block_lines(box)
+    
+    def _block_lines(self, box):
+        """Reconnaître un bloc (appelé sous le verrou par image_to_blocks)"""
+        level = tesserocr.RIL.WORD
+        self.api.SetRectangle(box['x'], box['y'], box['w'], box['h'])
+        self.api.Recognize()
+        lines = []
+        for word in tesserocr.iterate_level(self.api.GetIterator(), level):
+            text = word.GetUTF8Text(level)
+            if not text:
+                continue
+            if word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE) or not lines:
+                lines.append([])
+            lines[-1].append((text, word.Confidence(level)))
+        yield from lines
+    
+    def images_to_strings(self, images, timeout=0):
+        """
+        Reconnaître le texte de plusieurs images (moteur déjà résident: une
+        image après l'autre)
+        
+        Args:
+            images: Images PIL
+            timeout: Ignoré
+            
+        Returns:
+            list: Texte de chaque image, dans l'ordre
+        """
+        return [self.image_to_string(image) for image in images]
+    
+    def close(self):
+        """Libérer l'instance libtesseract"""
+        with self.lock:
+            self.api.End()
+
+
+def ocr_backend():
+    """Moteur OCR effectivement utilisé ("tesserocr" ou "pytesseract")"""
+    if OCR_BACKEND == 'auto':
+        return 'tesserocr' if tesserocr is not None else 'pytesseract'
+    return OCR_BACKEND
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """
+    Empreinte SHA-256 d'un fichier, lu par blocs (mémoire constante)
+    
+    Args:
+        path: Chemin du fichier
+        chunk_size: Taille des blocs lus
+        
+    Returns:
+        str: Empreinte hexadécimale
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OcrCache:
+    """
+    Textes OCR déjà lus, dans une base SQLite
+    
+    Clé: (empreinte du contenu du fichier, profil OCR, page). Un document
+    redéposé (nouvel essai après NON_TRAITES, doublon du scanner) est relu
+    par une simple consultation, quel que soit son nom. La taille totale des
+    textes est bornée: les entrées les moins récemment utilisées sont
+    évincées au-delà de max_bytes.
+    """
+    
+    SCHEMA = (
+        "PRAGMA journal_mode=WAL",
+        "CREATE TABLE IF NOT EXISTS ocr_cache ("
+        " digest TEXT, profile TEXT, page INTEGER, text TEXT, region TEXT,"
+        " size INTEGER, last_used REAL, PRIMARY KEY (digest, profile, page))",
+        "CREATE INDEX IF NOT EXISTS ocr_cache_last_used ON ocr_cache (last_used)",
+    )
+    
+    def __init__(self, path, max_bytes=OCR_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                    check_same_thread=False)
+        self.lock = threading.Lock()
+        for statement in self.SCHEMA:
+            self.conn.execute(statement)
+        self.size = self.conn.execute("SELECT TOTAL(size) FROM ocr_cache").fetchone()[0]
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+    
+    def get(self, digest, profile, page=1):
+        """
+        Texte OCR mémorisé
+        
+        Args:
+            digest: Empreinte du fichier (file_digest)
+            profile: Profil OCR (moteur, langue, résolution...)
+            page: Numéro de page
+            
+        Returns:
+            tuple: (texte, zone) ou None
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT text, region FROM ocr_cache WHERE digest = ? AND profile = ? AND page = ?",
+                (digest, profile, page)
+            ).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+            self.conn.execute(
+                "UPDATE ocr_cache SET last_used = ? WHERE digest = ? AND profile = ? AND page = ?",
+                (time.time(), digest, profile, page)
+            )
+            return row
+    
+    def put(self, digest, profile, text, region, page=1):
+        """
+        Mémoriser un texte OCR (évince les plus anciens au-delà de max_bytes)
+        
+        Args:
+            digest: Empreinte du fichier (file_digest)
+            profile: Profil OCR
+            text: Texte lu
+            region: Zone lue ("header" ou "page")
+            page: Numéro de page
+        """
+        size = len(text.encode('utf-8'))
+        with self.lock:
+            previous = self.conn.execute(
+                "SELECT size FROM ocr_cache WHERE digest = ? AND profile = ? AND page = ?",
+                (digest, profile, page)
+            ).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ocr_cache (digest, profile, page, text, region, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (digest, profile, page, text, region, size, time.time())
+            )
+            self.size += size - (previous[0] if previous else 0)
+            if self.size > self.max_bytes:
+                self._evict()
+    
+    def _evict(self):
+        """Supprimer les entrées les moins récemment utilisées (jusqu'à 90 % de max_bytes)"""
+        target = self.size - self.max_bytes * 0.9
+        freed, keys = 0, []
+        for rowid, size in self.conn.execute("SELECT rowid, size FROM ocr_cache ORDER BY last_used"):
+            keys.append((rowid,))
+            freed += size
+            if freed >= target:
+                break
+        self.conn.execute("BEGIN")
+        self.conn.executemany("DELETE FROM ocr_cache WHERE rowid = ?", keys)
+        self.conn.execute("COMMIT")
+        self.size -= freed
+        self.stats['evictions'] += len(keys)
+    
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM ocr_cache").fetchone()[0]
+    
+    def hit_rate(self):
+        """Part des lectures servies par le cache"""
+        total = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / total if total else 0.0
+    
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def create_ocr_engine(backend=None):
+    """
+    Créer le moteur OCR configuré
+    
+    Args:
+        backend: "tesserocr", "pytesseract" ou "auto" (OCR_BACKEND par défaut)
+        
+    Returns:
+        Moteur OCR (méthodes image_to_string et close)
+    """
+    requested = backend or OCR_BACKEND
+    backend = requested
+    if backend == 'auto':
+        backend = 'tesserocr' if tesserocr is not None else 'pytesseract'
+    if backend == 'tesserocr':
+        if tesserocr is None:
+            raise ImportError("tesserocr n'est pas installé (pip install tesserocr)")
+        try:
+            return TesserocrEngine()
+        except RuntimeError as e:
+            # Modèle "fra" introuvable par libtesseract (TESSDATA_PREFIX)
+            if requested != 'auto':
+                raise
+            logging.warning(f"tesserocr indisponible ({e}), repli sur pytesseract")
+    elif backend != 'pytesseract':
+        raise ValueError(f"Moteur OCR inconnu: {backend}")
+    return PytesseractEngine()
 
 
 class DocumentProcessor:
     """Traitement des documents scannés"""
     
-    def __init__(self, patient_db):
+    # "Patient : NOM Prénom" / "Nom : ..." (seule preuve qu'un en-tête suffit:
+    # OCR progressif et arrêt anticipé de l'OCR mot à mot)
+    LABEL_PATTERN = re.compile(r"(?:Patient|Nom)\s*:[ \t]*[A-ZÀ-Ÿ]", re.IGNORECASE)
+    
+    # "né(e) le JJ/MM/AAAA", "née le ...", "Date de naissance : ..." (é souvent lu e);
+    # \b: "donnée le", "mentionnée le" ne sont pas des dates de naissance
+    DOB_PATTERN = re.compile(
+        r'\b(?:n[ée]e?(?:\s*\(e\))?\s+le|date\s+de\s+naissance\s*:?)\s*'
+        r'(\d{1,2}\s*[/.-]\s*\d{1,2}\s*[/.-]\s*\d{4})',
+        re.IGNORECASE
+    )
+    
+    # Fin du nom sur la ligne "Patient : DUPONT Jean né le 01/02/1950"
+    # ("née MARTIN", nom de naissance, reste dans le nom)
+    NAME_END = re.compile(r'\s+(?:n[ée]e?(?:\s*\(e\))?(?:\s+le\b|\s*$)|date\s+de\s+naissance\b)',
+                          re.IGNORECASE)
+    
+    def __init__(self, patient_db, workers=0, render_workers=0, ocr_cache=None):
+        """
+        Args:
+            patient_db: Base patients (None dans les processus OCR)
+            workers: Nombre de processus OCR (0: OCR dans le processus courant)
+            render_workers: Nombre de processus de rendu en amont des
+                            processus OCR (0: rendu dans le processus OCR)
+            ocr_cache: Cache des textes OCR (OcrCache), consulté avant tout rendu
+        """
         self.patient_db = patient_db
+        self.ocr_cache = ocr_cache
+        self.workers = workers
+        self.render_workers = render_workers if workers else 0
+        self.pool = None
+        self.render_pool = None
+        if workers:
+            # "spawn": les processus n'héritent ni de l'index patients ni des
+            # threads et connexions du processus principal
+            context = multiprocessing.get_context('spawn')
+            self.pool = context.Pool(
+                workers, initializer=_init_ocr_worker, maxtasksperchild=OCR_WORKER_MAX_TASKS
+            )
+            if self.render_workers:
+                self.render_pool = context.Pool(
+                    self.render_workers, initializer=_init_ocr_worker,
+                    maxtasksperchild=OCR_WORKER_MAX_TASKS
+                )
+        self._lock = threading.Lock()
+        # Moteur OCR créé à la première page lue dans ce processus
+        self._engine = None
+        # Zone de page ayant suffi à l'OCR ("header" ou "page")
+        self.ocr_stats = Counter()
+        # Lectures tentées et documents identifiés par palier ("text_layer", "ocr_150"...)
+        self.tier_stats = {'attempts': Counter(), 'successes': Counter()}
+    
+    def extract_text(self, file_path):
+        """
+        Extraire le texte d'un document par la méthode la moins coûteuse
+        
+        Args:
+            file_path: Chemin du document (PDF ou image)
+            
+        Returns:
+            tuple: (texte, méthode) avec méthode "text_layer" (couche texte
+                   du PDF) ou "ocr" (premier palier de OCR_DPI_TIERS)
+        """
+        tier, text = next(self.text_tiers(file_path))
+        return text, 'text_layer' if tier == 'text_layer' else 'ocr'
+    
+    def text_tiers(self, file_path):
+        """
+        Lectures successives d'un document, de la moins coûteuse à la plus précise
+        
+        Args:
+            file_path: Chemin du document (PDF ou image)
+            
+        Yields:
+            tuple: (palier, texte) avec palier "text_layer" puis "ocr_<dpi>"
+                   pour chaque résolution de OCR_DPI_TIERS
+        """
+        if file_path.lower().endswith('.pdf'):
+            text = self.extract_text_layer(file_path)
+            if text is not None:
+                yield 'text_layer', text
+        # Empreinte calculée une fois pour tous les paliers (cache OCR)
+        digest = self.document_digest(file_path)
+        for dpi in self.ocr_tiers(file_path):
+            yield f'ocr_{dpi}', self.ocr_document(file_path, dpi, digest)
+    
+    def ocr_tiers(self, file_path):
+        """
+        Résolutions OCR à essayer pour un document
+        
+        Args:
+            file_path: Chemin du document (PDF ou image)
+            
+        Returns:
+            list: DPI croissants (OCR_DPI_TIERS; pour une image, jamais
+                  au-delà de sa résolution native)
+        """
+        if file_path.lower().endswith('.pdf'):
+            return list(OCR_DPI_TIERS)
+        native = self.image_dpi(file_path)
+        return sorted({min(dpi, native) for dpi in OCR_DPI_TIERS})
+    
+    def ocr_document(self, file_path, dpi, digest=None):
+        """
+        Extraire le texte de la 1re page d'un document via OCR à une résolution donnée
+        
+        Le cache OCR est consulté d'abord. Sinon, le rendu et l'OCR sont
+        confiés au pool de processus s'il existe; le fil appelant attend le
+        texte, la recherche patient reste ici.
+        
+        Args:
+            file_path: Chemin du document (PDF ou image)
+            dpi: Résolution de lecture
+            digest: Empreinte du fichier (document_digest), calculée si absente
+            
+        Returns:
+            str: Texte extrait
+        """
+        if digest is None:
+            digest = self.document_digest(file_path)
+        key = self._cache_key(digest, dpi)
+        if key is not None:
+            cached = self.ocr_cache.get(*key)
+            if cached is not None:
+                return cached[0]
+        
+        if self.pool is None:
+            text, region = self.read_page(file_path, dpi)
+        elif self.render_pool is None:
+            try:
+                text, region = self.pool.apply_async(_ocr_task, (file_path, dpi)).get(OCR_TASK_TIMEOUT)
+            except multiprocessing.TimeoutError:
+                logging.error(f"OCR abandonné après {OCR_TASK_TIMEOUT} s: {file_path}")
+                return ""
+        else:
+            text, region = self.pipeline_page(file_path, dpi)
+        if region:
+            self._count(self.ocr_stats, region)
+            if key is not None:
+                self.ocr_cache.put(*key, text, region)
+        return text
+    
+    def document_digest(self, file_path):
+        """
+        Empreinte du fichier pour le cache OCR
+        
+        Args:
+            file_path: Chemin du document
+            
+        Returns:
+            str: Empreinte SHA-256, ou None sans cache ou fichier illisible
+        """
+        if self.ocr_cache is None:
+            return None
+        try:
+            return file_digest(file_path)
+        except OSError as e:
+            logging.debug(f"Empreinte impossible pour {file_path}: {e}")
+            return None
+    
+    def _cache_key(self, digest, dpi, batch=False):
+        """
+        Clé du cache OCR pour la 1re page d'un document
+        
+        Args:
+            digest: Empreinte du fichier (document_digest)
+            dpi: Résolution de lecture
+            batch: Lecture par lot (texte brut, même avec OCR_WORD_LEVEL)
+            
+        Returns:
+            tuple: (empreinte du fichier, profil OCR), ou None sans cache
+        """
+        if self.ocr_cache is None or digest is None:
+            return None
+        # Mode de lecture: un texte brut du mode arriéré n'est jamais servi
+        # à la place d'un texte filtré mot à mot, et inversement
+        if OCR_WORD_LEVEL and not batch:
+            reading = f"mots={OCR_MIN_WORD_CONFIDENCE}/{OCR_NAME_CONFIDENCE}"
+        else:
+            reading = "texte"
+        return digest, f"{ocr_backend()}:fra:{dpi}dpi:entete={OCR_HEADER_FRACTION}:{reading}"
+    
+    def ocr_batch(self, file_paths, dpi, digests=None):
+        """
+        Extraire par OCR le texte de la 1re page de plusieurs documents
+        
+        Les pages absentes du cache OCR sont réparties en groupes d'au plus
+        OCR_BATCH_SIZE, lus en parallèle par le pool OCR s'il existe.
+        
+        Args:
+            file_paths: Chemins des documents (PDF ou images)
+            dpi: Résolution de lecture
+            digests: Empreintes des fichiers (document_digest), calculées si absentes
+            
+        Returns:
+            list: Texte de chaque document, dans l'ordre
+        """
+        texts = [None] * len(file_paths)
+        if digests is None:
+            digests = [self.document_digest(file_path) for file_path in file_paths]
+        keys = [self._cache_key(digest, dpi, batch=True) for digest in digests]
+        for i, key in enumerate(keys):
+            if key is not None:
+                cached = self.ocr_cache.get(*key)
+                if cached is not None:
+                    texts[i] = cached[0]
+        missing = [i for i, text in enumerate(texts) if text is None]
+        to_read = [file_paths[i] for i in missing]
+        
+        workers = max(self.workers, 1)
+        size = max(1, min(OCR_BATCH_SIZE, math.ceil(len(to_read) / workers)))
+        groups = [to_read[i:i + size] for i in range(0, len(to_read), size)]
+        if self.pool is None:
+            pages = [self.read_batch(group, dpi) for group in groups]
+        else:
+            pending = [self.pool.apply_async(_ocr_batch_task, (group, dpi)) for group in groups]
+            pages = []
+            for group, task in zip(groups, pending):
+                try:
+                    pages.append(task.get(OCR_TASK_TIMEOUT * len(group)))
+                except multiprocessing.TimeoutError:
+                    logging.error(f"OCR par lot abandonné après {OCR_TASK_TIMEOUT * len(group)} s")
+                    pages.append([("", None)] * len(group))
+        
+        for i, (text, region) in zip(missing, itertools.chain.from_iterable(pages)):
+            if region:
+                self._count(self.ocr_stats, region)
+                if keys[i] is not None:
+                    self.ocr_cache.put(*keys[i], text, region)
+            texts[i] = text
+        return texts
+    
+    def read_batch(self, file_paths, dpi):
+        """
+        Rendre puis lire par OCR la 1re page de plusieurs documents
+        
+        OCR progressif par lot: un appel pour les en-têtes de toutes les
+        pages, puis un pour les pages entières dont l'en-tête n'a pas suffi.
+        
+        Args:
+            file_paths: Chemins des documents (PDF ou images)
+            dpi: Résolution de lecture (voir read_page)
+            
+        Returns:
+            list: Couples (texte, zone) comme read_page, dans l'ordre
+        """
+        results = [("", None)] * len(file_paths)
+        pages = {}
+        for i, file_path in enumerate(file_paths):
+            try:
+                pages[i] = self.render_page(file_path, dpi)
+            except Exception as e:
+                logging.error(f"Erreur OCR sur {file_path}: {e}")
+        
+        try:
+            remaining = list(pages)
+            if OCR_HEADER_FRACTION and 0 < OCR_HEADER_FRACTION < 1:
+                headers = [pages[i].crop((0, 0, pages[i].width, int(pages[i].height * OCR_HEADER_FRACTION)))
+                           for i in remaining]
+                texts = self.engine.images_to_strings(headers, OCR_TASK_TIMEOUT * len(headers))
+                for i, text in zip(list(remaining), texts):
+                    if self.header_identifies(text):
+                        results[i] = (text, 'header')
+                        remaining.remove(i)
+            texts = self.engine.images_to_strings([pages[i] for i in remaining],
+                                                  OCR_TASK_TIMEOUT * len(remaining))
+            for i, text in zip(remaining, texts):
+                results[i] = (text, 'page')
+        except Exception as e:
+            logging.error(f"Erreur OCR par lot: {e}")
+        return results
+    
+    def pipeline_page(self, file_path, dpi):
+        """
+        Rendre la page dans un processus de rendu, puis la lire dans un
+        processus OCR
+        
+        Les pixels (niveaux de gris bruts) passent d'un processus à l'autre
+        par un segment de mémoire partagée, sans sérialisation ni
+        réencodage; le segment est libéré ici une fois l'OCR terminé.
+        
+        Args:
+            file_path: Chemin du document (PDF ou image)
+            dpi: Résolution de lecture (voir read_page)
+            
+        Returns:
+            tuple: (texte, zone) comme read_page
+        """
+        try:
+            page = self.render_pool.apply_async(_render_task, (file_path, dpi)).get(OCR_TASK_TIMEOUT)
+        except multiprocessing.TimeoutError:
+            logging.error(f"Rendu abandonné après {OCR_TASK_TIMEOUT} s: {file_path}")
+            return "", None
+        if page is None:
+            return "", None
+        try:
+            return self.pool.apply_async(_ocr_shared_task, (file_path, *page)).get(OCR_TASK_TIMEOUT)
+        except multiprocessing.TimeoutError:
+            logging.error(f"OCR abandonné après {OCR_TASK_TIMEOUT} s: {file_path}")
+            return "", None
+        finally:
+            _release_page(page[0])
+    
+    def read_page(self, file_path, dpi):
+        """
+        Rendre puis lire par OCR la 1re page d'un document
+        
+        Args:
+            file_path: Chemin du document (PDF ou image)
+            dpi: Résolution de lecture (None: la plus haute de OCR_DPI_TIERS pour
+                 un PDF, résolution native pour une image)
+            
+        Returns:
+            tuple: (texte, zone) avec zone "header", "page" ou None en cas d'erreur
+        """
+        try:
+            return self.ocr_image(self.render_page(file_path, dpi))
+        except Exception as e:
+            logging.error(f"Erreur OCR sur {file_path}: {e}")
+            return "", None
+    
+    def render_page(self, file_path, dpi):
+        """
+        Image en niveaux de gris de la 1re page d'un document
+        
+        Args:
+            file_path: Chemin du document (PDF ou image)
+            dpi: Résolution de rendu (voir read_page)
+            
+        Returns:
+            Image: Page (image PIL)
+        """
+        if file_path.lower().endswith('.pdf'):
+            # Niveaux de gris: rendu et OCR plus rapides
+            images = pdf2image.convert_from_path(file_path, dpi=dpi or OCR_DPI_TIERS[-1],
+                                                 first_page=1, last_page=1, grayscale=True)
+            return images[0]
+        return self.load_image(file_path, dpi)
+    
+    def _count(self, counter, key):
+        """Incrémenter un compteur partagé entre les fils de traitement"""
+        with self._lock:
+            counter[key] += 1
+    
+    def close(self):
+        """Arrêter les pools de processus de rendu et d'OCR et le moteur OCR"""
+        for pool in (self.render_pool, self.pool):
+            if pool is not None:
+                pool.close()
+                pool.join()
+        self.pool = self.render_pool = None
+        if self._engine is not None:
+            self._engine.close()
+            self._engine = None
+    
+    def extract_text_layer(self, pdf_path):
+        """
+        Lire la couche texte de la 1re page d'un PDF
+        
+        Args:
+            pdf_path: Chemin du fichier PDF
+            
+        Returns:
+            str: Texte de la page, ou None si le PDF n'a pas de couche texte
+                 exploitable (scan image seule, texte illisible, PDF chiffré)
+        """
+        if not PDF_TEXT_LAYER:
+            return None
+        try:
+            reader = PyPDF2.PdfReader(pdf_path)
+            if reader.is_encrypted or not reader.pages:
+                return None
+            text = reader.pages[0].extract_text() or ""
+        except Exception as e:
+            logging.debug(f"Couche texte illisible pour {pdf_path}: {e}")
+            return None
+        
+        # Exploitable: assez de caractères, en majorité des lettres
+        chars = [c for c in text if not c.isspace()]
+        if len(chars) < PDF_TEXT_MIN_CHARS:
+            return None
+        if sum(c.isalpha() for c in chars) < len(chars) / 2:
+            return None
+        return text
     
     def extract_text_from_pdf(self, pdf_path):
         """
-        Extraire le texte d'un PDF via OCR
+        Extraire le texte d'un PDF (couche texte si exploitable, sinon OCR)
+        
+        Args:
+            pdf_path: Chemin du fichier PDF
+            
+        Returns:
+            str: Texte extrait
+        """
+        return self.extract_text(pdf_path)[0]
+    
+    def ocr_pdf(self, pdf_path, dpi=None):
+        """
+        Extraire le texte de la 1re page d'un PDF via OCR
         
         Args:
             pdf_path: Chemin du fichier PDF
+            dpi: Résolution du rendu (par défaut la plus haute de OCR_DPI_TIERS)
             
         Returns:
             str: Texte extrait
         """
+        return self.read_page(pdf_path, dpi)[0]
+    
+    def ocr_image(self, image):
+        """
+        OCR progressif d'une page: bande d'en-tête d'abord, page entière
+        seulement si l'en-tête ne contient pas de ligne « Patient : »
+        
+        Args:
+            image: Page (image PIL)
+            
+        Returns:
+            tuple: (texte, zone) avec zone "header" ou "page"
+        """
+        if OCR_WORD_LEVEL:
+            return self.ocr_words(image)
+        if OCR_HEADER_FRACTION and 0 < OCR_HEADER_FRACTION < 1:
+            width, height = image.size
+            header = image.crop((0, 0, width, int(height * OCR_HEADER_FRACTION)))
+            text = self.tesseract(header)
+            if self.header_identifies(text):
+                return text, 'header'
+        
+        text = self.tesseract(image)
+        return text, 'page'
+    
+    def header_identifies(self, text):
+        """
+        La bande d'en-tête suffit-elle à identifier le patient
+        
+        Seule une ligne « Patient : NOM Prénom » (ou « Nom : ») compte: un
+        en-tête de cabinet en majuscules (« CABINET DE RADIOLOGIE ») serait
+        sinon pris pour un nom, et la ligne du patient plus bas jamais lue.
+        
+        Args:
+            text: Texte OCR de la bande d'en-tête
+            
+        Returns:
+            bool: True si la page entière n'a pas besoin d'être lue
+        """
+        return any(self.LABEL_PATTERN.search(line) and self.extract_patient_name(line)
+                   for line in text.splitlines())
+    
+    def ocr_words(self, image):
+        """
+        OCR mot à mot d'une page, bloc par bloc dans l'ordre de lecture
+        
+        Les mots de confiance inférieure à OCR_MIN_WORD_CONFIDENCE sont
+        écartés. Une fois « Patient : NOM Prénom » reconnu avec au moins
+        OCR_NAME_CONFIDENCE, la lecture continue jusqu'à la date de
+        naissance (DOB_PATTERN), sans dépasser la bande d'en-tête (ou, pour
+        un nom plus bas dans la page, une hauteur de bande sous le nom).
+        Avec un moteur qui reconnaît toute l'image d'un coup, la bande
+        d'en-tête est lue d'abord, comme en OCR progressif.
+        
+        Args:
+            image: Page (image PIL)
+            
+        Returns:
+            tuple: (texte filtré, zone) avec zone "header" si la lecture s'est
+                   arrêtée avant la fin de la page, sinon "page"
+        """
+        width, height = image.size
+        band_height = height
+        bands = []
+        if OCR_HEADER_FRACTION and 0 < OCR_HEADER_FRACTION < 1:
+            band_height = int(height * OCR_HEADER_FRACTION)
+            if not self.engine.incremental:
+                bands.append(image.crop((0, 0, width, band_height)))
+        bands.append(image)
+        
+        text = ""
+        for band in bands:
+            lines = []
+            # Ordonnée au-delà de laquelle la date de naissance n'est plus cherchée
+            limit = None
+            blocks = self.engine.image_to_blocks(band)
+            try:
+                for top, block in blocks:
+                    if limit is not None and top >= limit:
+                        return '\n'.join(lines), 'header'
+                    for words in block:
+                        kept = [(word, conf) for word, conf in words if conf >= OCR_MIN_WORD_CONFIDENCE]
+                        if not kept:
+                            continue
+                        line = ' '.join(word for word, _ in kept)
+                        lines.append(line)
+                        if (limit is None and self.LABEL_PATTERN.search(line)
+                                and self.extract_patient_name(line)
+                                and min(conf for _, conf in kept) >= OCR_NAME_CONFIDENCE):
+                            limit = band_height if top < band_height else top + band_height
+                    if limit is not None and self.DOB_PATTERN.search('\n'.join(lines)):
+                        return '\n'.join(lines), 'header'
+            finally:
+                blocks.close()
+            text = '\n'.join(lines)
+            # En-tête lu en entier: « Patient : » moins sûr suffit aussi
+            if band is not image and self.header_identifies(text):
+                return text, 'header'
+        return text, 'page'
+    
+    @property
+    def engine(self):
+        """Moteur OCR de ce processus (voir OCR_BACKEND), créé à la demande"""
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = create_ocr_engine()
+                    logging.info(f"Moteur OCR: {self._engine.name}")
+        return self._engine
+    
+    def tesseract(self, image):
+        """
+        Lancer Tesseract sur une image
+        
+        Args:
+            image: Image PIL
+            
+        Returns:
+            str: Texte reconnu
+        """
+        return self.engine.image_to_string(image)
+    
+    def image_dpi(self, image_path):
+        """
+        Résolution native d'une image scannée
+        
+        Args:
+            image_path: Chemin du fichier image
+            
+        Returns:
+            int: DPI horizontal (SCAN_DEFAULT_DPI si l'image ne l'indique pas)
+        """
         try:
-            # Convertir PDF en images
-            images = pdf2image.convert_from_path(pdf_path, first_page=1, last_page=1)
+            with Image.open(image_path) as image:
+                dpi = image.info.get('dpi')
+        except Exception:
+            return SCAN_DEFAULT_DPI
+        return int(round(dpi[0])) if dpi and dpi[0] else SCAN_DEFAULT_DPI
+    
+    def load_image(self, image_path, dpi=None):
+        """
+        Charger une image en niveaux de gris, réduite à la résolution demandée
+        
+        Args:
+            image_path: Chemin du fichier image
+            dpi: Résolution cible (None: résolution native)
             
-            # OCR sur la première page
-            text = pytesseract.image_to_string(images[0], lang='fra')
-            return text
-        except Exception as e:
-            logging.error(f"Erreur OCR sur {pdf_path}: {e}")
-            return ""
+        Returns:
+            Image: Image PIL en niveaux de gris
+        """
+        image = Image.open(image_path)
+        native = self.image_dpi(image_path)
+        image = image.convert('L')
+        if dpi and dpi < native:
+            scale = dpi / native
+            image = image.resize((max(1, round(image.width * scale)),
+                                  max(1, round(image.height * scale))), Image.LANCZOS)
+        return image
     
-    def extract_text_from_image(self, image_path):
+    def extract_text_from_image(self, image_path, dpi=None):
         """
         Extraire le texte d'une image via OCR
         
         Args:
             image_path: Chemin du fichier image
+            dpi: Résolution de lecture (None: résolution native)
             
         Returns:
             str: Texte extrait
         """
-        try:
-            image = Image.open(image_path)
-            text = pytesseract.image_to_string(image, lang='fra')
-            return text
-        except Exception as e:
-            logging.error(f"Erreur OCR sur {image_path}: {e}")
-            return ""
+        return self.read_page(image_path, dpi)[0]
     
     def extract_patient_name(self, text):
         """
@@ -171,17 +1595,35 @@ class DocumentProcessor:
         Returns:
             str: Nom potentiel du patient
         """
+        return self.extract_patient_identity(text)[0]
+    
+    def extract_patient_identity(self, text):
+        """
+        Extraire le nom et la date de naissance du patient du texte OCR
+        
+        Args:
+            text: Texte brut de l'OCR
+            
+        Returns:
+            tuple: (nom potentiel ou None, date "JJ/MM/AAAA" ou None)
+        """
+        match = self.DOB_PATTERN.search(text)
+        dob = re.sub(r'\s+', '', match.group(1)) if match else None
+        return self._extract_name(text), dob
+    
+    def _extract_name(self, text):
+        """Nom potentiel du patient (patterns puis lignes en majuscules)"""
         # Patterns courants dans les documents médicaux
         patterns = [
-            r'(?:Patient|Nom)\s*:\s*([A-ZÀ-Ÿ\s]+)',
+            r"(?:Patient|Nom)\s*:[ \t]*([A-ZÀ-Ÿ' \t-]+)",
             r'(?:M\.|Mme|Mr)\s+([A-ZÀ-Ÿ]+\s+[A-ZÀ-Ÿ]+)',
-            r'([A-ZÀ-Ÿ]+)\s+([A-ZÀ-Ÿ]+)\s+né',
+            r'([A-ZÀ-Ÿ]+\s+[A-ZÀ-Ÿ]+)\s+né',
         ]
         
         for pattern in patterns:
             match = re.search(pattern, text, re.IGNORECASE)
             if match:
-                return match.group(1).strip()
+                return self.NAME_END.split(match.group(1), maxsplit=1)[0].strip()
         
         # Si pas de pattern trouvé, chercher les premières lignes avec des MAJ
         lines = text.split('\n')
@@ -192,63 +1634,266 @@ class DocumentProcessor:
         
         return None
     
+    # Classement des résultats pour retenir le meilleur palier de la cascade
+    RESULT_RANK = {'no_text': 0, 'no_name': 1, 'patient_not_found': 2, 'low_confidence': 3}
+    
     def process_document(self, file_path):
         """
         Traiter un document scanné
         
+        Couche texte du PDF d'abord, puis OCR à résolution croissante
+        (OCR_DPI_TIERS) tant que le patient n'est pas identifié avec une
+        confiance suffisante.
+        
         Args:
             file_path: Chemin du document
             
         Returns:
-            dict: Informations sur le traitement
+            dict: Informations sur le traitement ('tier': palier retenu)
         """
         logging.info(f"Traitement de: {file_path}")
         
-        # Extraction du texte
-        if file_path.lower().endswith('.pdf'):
-            text = self.extract_text_from_pdf(file_path)
+        start = time.perf_counter()
+        result = None
+        for tier, text in self.text_tiers(file_path):
+            result, done = self._attempt(result, text, tier)
+            if done:
+                break
+        
+        logging.info(f"Texte extrait ({result['tier']}) en {(time.perf_counter() - start) * 1000:.0f} ms")
+        return self._finish(file_path, result)
+    
+    def process_batch(self, file_paths):
+        """
+        Traiter par lots des documents en attente (démarrage avec un arriéré)
+        
+        Même cascade que process_document, mais palier par palier pour tout
+        le lot: les pages encore non identifiées sont lues ensemble
+        (ocr_batch), avec un appel tesseract par groupe de pages.
+        
+        Args:
+            file_paths: Chemins des documents
+            
+        Returns:
+            list: Informations sur le traitement de chaque document, dans l'ordre
+        """
+        logging.info(f"Traitement par lots de {len(file_paths)} documents")
+        start = time.perf_counter()
+        results = {}
+        pending = []
+        for file_path in file_paths:
+            text = self.extract_text_layer(file_path) if file_path.lower().endswith('.pdf') else None
+            if text is not None:
+                results[file_path], done = self._attempt(None, text, 'text_layer')
+                if done:
+                    continue
+            pending.append(file_path)
+        
+        # Paliers restant à lire pour chaque document
+        tiers = {file_path: self.ocr_tiers(file_path) for file_path in pending}
+        # Empreintes calculées une fois pour tous les paliers (cache OCR)
+        digests = {file_path: self.document_digest(file_path) for file_path in pending}
+        while pending:
+            # Les documents au même palier sont lus ensemble
+            dpi = min(tiers[file_path][0] for file_path in pending)
+            batch = [file_path for file_path in pending if tiers[file_path][0] == dpi]
+            texts = self.ocr_batch(batch, dpi, [digests[file_path] for file_path in batch])
+            for file_path, text in zip(batch, texts):
+                tiers[file_path].pop(0)
+                results[file_path], done = self._attempt(results.get(file_path), text, f'ocr_{dpi}')
+                if done or not tiers[file_path]:
+                    pending.remove(file_path)
+        
+        elapsed = time.perf_counter() - start
+        logging.info(f"{len(file_paths)} documents lus en {elapsed:.1f} s "
+                     f"({elapsed / max(len(file_paths), 1) * 1000:.0f} ms par document)")
+        return [self._finish(file_path, results[file_path]) for file_path in file_paths]
+    
+    def _attempt(self, result, text, tier):
+        """
+        Évaluer une lecture d'un document dans la cascade
+        
+        Args:
+            result: Meilleur résultat des paliers précédents (ou None)
+            text: Texte lu à ce palier
+            tier: Palier ("text_layer", "ocr_150"...)
+            
+        Returns:
+            tuple: (meilleur résultat, True si la cascade s'arrête)
+        """
+        self._count(self.tier_stats['attempts'], tier)
+        attempt = self.identify(text, tier)
+        if result is None or self._rank(attempt) > self._rank(result):
+            result = attempt
+        if attempt['success']:
+            return result, True
+        # Couche texte avec un nom lisible: l'OCR n'en donnerait pas un meilleur
+        if tier == 'text_layer' and attempt['reason'] not in ('no_text', 'no_name'):
+            return result, True
+        logging.info(f"Palier {tier} insuffisant ({attempt['reason']})")
+        return result, False
+    
+    def _finish(self, file_path, result):
+        """
+        Comptabiliser et journaliser le résultat retenu pour un document
+        
+        Args:
+            file_path: Chemin du document
+            result: Meilleur résultat de la cascade
+            
+        Returns:
+            dict: Le résultat (avec 'file_path' si identifié)
+        """
+        if result['success']:
+            self._count(self.tier_stats['successes'], result['tier'])
+            result['file_path'] = file_path
+            logging.info(
+                f"Patient identifié: {result['nom']} {result['prenom']} "
+                f"(confiance: {result['confidence']}, écart: {result['margin']:.2f})"
+            )
+        elif result['reason'] == 'no_text':
+            logging.warning(f"Aucun texte extrait de {file_path}")
+        elif result['reason'] == 'no_name':
+            logging.warning(f"Aucun nom de patient trouvé dans {file_path}")
+        elif result['reason'] == 'patient_not_found':
+            logging.warning(f"Patient non trouvé: {result['extracted_name']}")
         else:
-            text = self.extract_text_from_image(file_path)
+            logging.warning(f"Confiance trop faible ({result['confidence']}) pour {result['patient']}")
+        return result
+    
+    def _rank(self, result):
+        """Clé de comparaison de deux résultats (identifié > confiance faible > ...)"""
+        if result['success']:
+            return (len(self.RESULT_RANK), result['confidence'])
+        return (self.RESULT_RANK[result['reason']], result.get('confidence', 0))
+    
+    def identify(self, text, tier):
+        """
+        Identifier le patient à partir du texte d'un document
         
+        Args:
+            text: Texte extrait
+            tier: Palier de lecture ("text_layer", "ocr_150"...)
+            
+        Returns:
+            dict: Informations sur l'identification
+        """
+        text_source = 'text_layer' if tier == 'text_layer' else 'ocr'
         if not text:
-            logging.warning(f"Aucun texte extrait de {file_path}")
-            return {'success': False, 'reason': 'no_text'}
+            return {'success': False, 'reason': 'no_text', 'text_source': text_source, 'tier': tier}
         
-        # Extraction du nom du patient
-        patient_name = self.extract_patient_name(text)
+        # Extraction du nom (et de la date de naissance) du patient
+        patient_name, dob = self.extract_patient_identity(text)
         if not patient_name:
-            logging.warning(f"Aucun nom de patient trouvé dans {file_path}")
-            return {'success': False, 'reason': 'no_name'}
+            return {'success': False, 'reason': 'no_name', 'text_source': text_source, 'tier': tier}
         
-        # Recherche du patient dans la base
-        patient = self.patient_db.find_patient(patient_name)
-        if not patient:
-            logging.warning(f"Patient non trouvé: {patient_name}")
-            return {'success': False, 'reason': 'patient_not_found', 'extracted_name': patient_name}
+        # Recherche du patient dans la base (candidats suivants pour mesurer
+        # l'écart), homonymes départagés par la date de naissance si elle a été lue
+        candidates = self.patient_db.find_candidates(patient_name, k=3 if dob else 2,
+                                                     dob=dob, with_dob=True)
+        if not candidates:
+            return {'success': False, 'reason': 'patient_not_found', 'extracted_name': patient_name,
+                    'text_source': text_source, 'tier': tier}
         
-        patient_id, nom, prenom, confidence = patient
+        (patient_id, nom, prenom), confidence, born = candidates[0]
+        # Écart avec le candidat suivant, après départage: un homonyme de même
+        # score né un autre jour n'est plus un concurrent. Proche de 0 =
+        # correspondance ambiguë
+        rivals = [score for _, score, rival_born in candidates[1:]
+                  if rival_born or not born or score < confidence]
+        margin = confidence - rivals[0] if rivals else confidence
         
-        if confidence < 0.8:
-            logging.warning(f"Confiance trop faible ({confidence}) pour {nom} {prenom}")
+        if confidence < CONFIDENCE_THRESHOLD:
             return {
                 'success': False,
                 'reason': 'low_confidence',
                 'patient': f"{nom} {prenom}",
-                'confidence': confidence
+                'extracted_name': patient_name,
+                'confidence': confidence,
+                'margin': margin,
+                'text_source': text_source,
+                'tier': tier
             }
         
-        logging.info(f"Patient identifié: {nom} {prenom} (confiance: {confidence})")
-        
         return {
             'success': True,
             'patient_id': patient_id,
             'nom': nom,
             'prenom': prenom,
             'confidence': confidence,
-            'file_path': file_path
+            'margin': margin,
+            'dob': dob,
+            'text_source': text_source,
+            'tier': tier
         }
 
 
+# Processus OCR: un DocumentProcessor sans base patients par processus
+_worker_processor = None
+
+
+def _init_ocr_worker():
+    """Initialiser un processus du pool OCR"""
+    global _worker_processor
+    _worker_processor = DocumentProcessor(patient_db=None)
+
+
+def _ocr_task(file_path, dpi):
+    """Lire une page dans un processus du pool OCR (voir DocumentProcessor.read_page)"""
+    return _worker_processor.read_page(file_path, dpi)
+
+
+def _ocr_batch_task(file_paths, dpi):
+    """Lire un groupe de pages dans un processus du pool OCR (voir DocumentProcessor.read_batch)"""
+    return _worker_processor.read_batch(file_paths, dpi)
+
+
+def _render_task(file_path, dpi):
+    """
+    Rendre une page dans un processus de rendu, pixels en mémoire partagée
+    
+    Returns:
+        tuple: (nom du segment, largeur, hauteur), ou None en cas d'erreur
+    """
+    try:
+        image = _worker_processor.render_page(file_path, dpi)
+        if image.mode != 'L':
+            image = image.convert('L')
+        pixels = image.tobytes()
+    except Exception as e:
+        logging.error(f"Erreur de rendu de {file_path}: {e}")
+        return None
+    segment = shared_memory.SharedMemory(create=True, size=max(len(pixels), 1))
+    segment.buf[:len(pixels)] = pixels
+    segment.close()
+    return segment.name, image.width, image.height
+
+
+def _ocr_shared_task(file_path, name, width, height):
+    """Lire par OCR une page rendue en mémoire partagée (voir _render_task)"""
+    segment = shared_memory.SharedMemory(name=name)
+    try:
+        # Image adossée au segment, sans copie des pixels
+        image = Image.frombuffer('L', (width, height), segment.buf[:width * height], 'raw', 'L', 0, 1)
+        return _worker_processor.ocr_image(image)
+    except Exception as e:
+        logging.error(f"Erreur OCR sur {file_path}: {e}")
+        return "", None
+    finally:
+        image = None
+        segment.close()
+
+
+def _release_page(name):
+    """Libérer le segment de mémoire partagée d'une page lue"""
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    segment.close()
+    segment.unlink()
+
+
 class MedistoryIntegration:
     """Intégration avec Médistory"""
     
@@ -314,6 +1959,19 @@ class ScanWatcher(FileSystemEventHandler):
         self.medistory = medistory
         self.processed_folder = processed_folder
         os.makedirs(processed_folder, exist_ok=True)
+        # Documents en cours de traitement: un scan arrivé pendant le
+        # démarrage est vu à la fois par l'observateur et par l'arriéré
+        self._claimed = set()
+        self._lock = threading.Lock()
+        # Un fil par processus de rendu et d'OCR: le fil d'observation
+        # n'attend jamais l'OCR, et un document peut être rendu pendant que
+        # le précédent est lu
+        self.executor = None
+        if processor.workers:
+            self.executor = ThreadPoolExecutor(
+                max_workers=processor.workers + processor.render_workers,
+                thread_name_prefix="scan"
+            )
     
     def on_created(self, event):
         """Appelé quand un nouveau fichier est détecté"""
@@ -326,12 +1984,111 @@ class ScanWatcher(FileSystemEventHandler):
         if file_path.endswith(('.tmp', '.download')):
             return
         
-        # Attendre que le fichier soit complètement écrit
-        time.sleep(2)
+        # Déjà pris en charge (arriéré au démarrage)
+        if not self.claim(file_path):
+            return
         
-        # Traiter le document
-        result = self.processor.process_document(file_path)
+        if self.executor is None:
+            self.handle(file_path)
+        else:
+            self.executor.submit(self._handle_safely, file_path)
+    
+    def _handle_safely(self, file_path):
+        """Traiter un document dans un fil du pool (erreurs journalisées)"""
+        try:
+            self.handle(file_path)
+        except Exception:
+            logging.exception(f"Erreur de traitement de {file_path}")
+    
+    def claim(self, file_path):
+        """
+        Réserver un document pour un seul traitement
         
+        Args:
+            file_path: Chemin du document
+            
+        Returns:
+            bool: False si le document est déjà en cours de traitement
+        """
+        file_path = os.path.abspath(file_path)
+        with self._lock:
+            if file_path in self._claimed:
+                return False
+            self._claimed.add(file_path)
+            return True
+    
+    def release(self, file_path):
+        """Libérer un document traité (un nouveau scan peut reprendre ce nom)"""
+        with self._lock:
+            self._claimed.discard(os.path.abspath(file_path))
+    
+    def shutdown(self):
+        """Attendre la fin des documents en cours de traitement"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+    
+    def handle(self, file_path):
+        """
+        Identifier un document puis l'importer dans Médistory ou le mettre de côté
+        
+        Args:
+            file_path: Chemin du document
+        """
+        try:
+            # Attendre que le fichier soit complètement écrit
+            time.sleep(2)
+            
+            # Traiter le document (sauf s'il a déjà été classé entre-temps)
+            if not os.path.exists(file_path):
+                return
+            result = self.processor.process_document(file_path)
+            self.dispatch(file_path, result)
+        finally:
+            self.release(file_path)
+    
+    def process_backlog(self, folder):
+        """
+        Traiter par lots les documents déjà présents dans le dossier surveillé
+        
+        Les documents déjà pris en charge par l'observateur (arrivés pendant
+        le démarrage) sont laissés à celui-ci, et inversement.
+        
+        Args:
+            folder: Dossier des scans entrants
+            
+        Returns:
+            int: Nombre de documents traités
+        """
+        file_paths = sorted(
+            (entry.path for entry in os.scandir(folder)
+             if entry.is_file() and not entry.name.startswith('.')
+             and not entry.name.endswith(('.tmp', '.download'))),
+            key=os.path.getmtime
+        )
+        file_paths = [file_path for file_path in file_paths if self.claim(file_path)]
+        if not file_paths:
+            return 0
+        logging.info(f"{len(file_paths)} documents en attente dans {folder}")
+        try:
+            results = self.processor.process_batch(file_paths)
+            for file_path, result in zip(file_paths, results):
+                try:
+                    self.dispatch(file_path, result)
+                except Exception:
+                    logging.exception(f"Erreur de traitement de {file_path}")
+        finally:
+            for file_path in file_paths:
+                self.release(file_path)
+        return len(file_paths)
+    
+    def dispatch(self, file_path, result):
+        """
+        Importer un document identifié dans Médistory, sinon le mettre de côté
+        
+        Args:
+            file_path: Chemin du document
+            result: Résultat de DocumentProcessor.process_document
+        """
         if result['success']:
             # Importer dans Médistory
             success = self.medistory.import_document(
@@ -359,6 +2116,11 @@ class ScanWatcher(FileSystemEventHandler):
             dest = os.path.join(unprocessed_folder, f"{reason}_{os.path.basename(file_path)}")
             shutil.move(file_path, dest)
             logging.warning(f"✗ Document non traité ({reason}): {dest}")
+            
+            # Texte extrait conservé pour le classement manuel (resolve_alias.py)
+            aliases = self.processor.patient_db.aliases
+            if aliases is not None and result.get('extracted_name'):
+                aliases.record_pending(os.path.basename(dest), result['extracted_name'], reason)
 
 
 def main():
@@ -373,7 +2135,15 @@ def main():
     
     # Initialiser les composants
     patient_db = PatientDatabase()
-    processor = DocumentProcessor(patient_db)
+    patient_db.start_refresher(PATIENT_REFRESH_INTERVAL)
+    ocr_cache = None
+    if OCR_CACHE_FILE:
+        try:
+            ocr_cache = OcrCache(OCR_CACHE_FILE)
+        except Exception as e:
+            logging.warning(f"Cache OCR indisponible: {e}")
+    processor = DocumentProcessor(patient_db, workers=OCR_WORKERS,
+                                  render_workers=OCR_RENDER_WORKERS, ocr_cache=ocr_cache)
     medistory = MedistoryIntegration(MEDISTORY_IMPORT_FOLDER)
     
     # Configurer la surveillance
@@ -386,10 +2156,48 @@ def main():
     logging.info("Appuyez sur Ctrl+C pour arrêter...")
     
     try:
+        # Scans arrivés pendant l'arrêt du système
+        event_handler.process_backlog(WATCHED_FOLDER)
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
         observer.stop()
+        event_handler.shutdown()
+        processor.close()
+        patient_db.stop_refresher()
+        stats = patient_db.matcher.stats
+        logging.info(
+            f"Recherches patients: {stats['lookups']} "
+            f"(correspondances exactes: {patient_db.matcher.exact_hit_rate():.0%})"
+        )
+        cache_stats = patient_db.lookup_cache.stats
+        logging.info(
+            f"Cache recherches: {patient_db.lookup_cache.hit_rate():.0%} de succès "
+            f"({cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+            f"{cache_stats['evictions']} évictions)"
+        )
+        if patient_db.aliases is not None:
+            logging.info(
+                f"Alias appris: {patient_db.aliases.hit_rate():.0%} des recherches "
+                f"({patient_db.aliases.stats['hits']} résolues)"
+            )
+        if processor.ocr_cache is not None:
+            ocr_cache_stats = processor.ocr_cache.stats
+            logging.info(
+                f"Cache OCR: {processor.ocr_cache.hit_rate():.0%} de succès "
+                f"({ocr_cache_stats['hits']} hits, {ocr_cache_stats['misses']} misses, "
+                f"{ocr_cache_stats['evictions']} évictions)"
+            )
+        if processor.ocr_stats:
+            logging.info(
+                f"OCR: {processor.ocr_stats['header']} pages lues sur l'en-tête seul, "
+                f"{processor.ocr_stats['page']} en page entière"
+            )
+        for tier, attempts in processor.tier_stats['attempts'].items():
+            logging.info(
+                f"Palier {tier}: {attempts} lectures, "
+                f"{processor.tier_stats['successes'][tier]} documents identifiés"
+            )
         logging.info("Arrêt du système")
     
     observer.join()
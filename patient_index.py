@@ -0,0 +1,2147 @@
+#!/usr/bin/env python3
+"""
+Index de recherche des patients pour le système de classement automatique
+Construit une seule fois au chargement de la base pour éviter de parcourir
+toute la liste des patients à chaque document scanné
+"""
+
+import re
+import csv
+import io
+import codecs
+import sqlite3
+import sys
+import json
+import mmap
+import os
+import threading
+import unicodedata
+from array import array
+from collections import Counter, OrderedDict
+from datetime import date
+from functools import lru_cache
+from collections.abc import Sequence
+from difflib import SequenceMatcher
+
+try:
+    import numpy as np
+except ImportError:  # Recherche par lots sans NumPy: repli sur l'index
+    np = None
+
+# Nombre maximum de candidats retenus par l'index avant le scoring flou
+NGRAM_CANDIDATES = 50
+
+# Distance d'édition maximale acceptée par le BK-tree (erreurs OCR typiques)
+BKTREE_MAX_DISTANCE = 2
+
+# Générateurs de candidats disponibles pour PatientMatcher
+MATCHING_MODES = ('ngram', 'bktree', 'phonetic', 'tokens')
+
+# Seuil minimum du matching flou (comme difflib.get_close_matches)
+MATCH_CUTOFF = 0.6
+
+# Nombre de recherches mémorisées par le cache LRU
+LOOKUP_CACHE_SIZE = 1024
+
+# Taille maximale (requêtes x patients) d'une matrice de scores par lot
+BATCH_CELLS = 4_000_000
+
+# Caractères que la décomposition NFKD ne sépare pas de leur lettre de base
+LIGATURES = str.maketrans({'Œ': 'OE', 'Æ': 'AE', 'ß': 'SS'})
+
+# Apostrophes supprimées (O'BRIEN -> OBRIEN), tirets remplacés par un espace
+SEPARATEURS = str.maketrans({"'": None, '’': None, '`': None, '-': ' ', '‐': ' '})
+
+
+def normalize_name(text):
+    """
+    Normaliser un nom pour la comparaison
+
+    Majuscules, suppression des accents (MÜLLER -> MULLER, LEFÈVRE -> LEFEVRE),
+    des apostrophes et des tirets, espaces multiples réduits à un seul.
+
+    Args:
+        text: Nom brut (base patients ou texte OCR)
+
+    Returns:
+        str: Clé normalisée
+    """
+    text = text.upper().translate(LIGATURES)
+    # Texte ASCII (la plupart des noms): pas d'accents à retirer
+    if not text.isascii():
+        text = unicodedata.normalize('NFKD', text)
+        text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.translate(SEPARATEURS).split())
+
+
+@lru_cache(maxsize=1 << 16)
+def _normalize_field(text):
+    """normalize_name avec cache: prénoms et noms fréquents reviennent souvent"""
+    return normalize_name(str(text)) if text is not None else ''  # NULL SQL
+
+
+def patient_key(nom, prenom):
+    """
+    Clé normalisée d'un patient, identique à normalize_name(f"{nom} {prenom}")
+
+    Chaque champ est normalisé séparément avec un cache, ce qui évite de
+    refaire le travail pour les milliers de patients partageant un prénom.
+    """
+    nom, prenom = _normalize_field(nom), _normalize_field(prenom)
+    return f"{nom} {prenom}" if nom and prenom else nom or prenom
+
+
+# Dates de naissance: JJ/MM/AAAA (documents, fichier texte) ou AAAA-MM-JJ (SQL)
+DOB_FORMATS = (
+    re.compile(r'(?P<d>\d{1,2})\s*[/.-]\s*(?P<m>\d{1,2})\s*[/.-]\s*(?P<y>\d{4})'),
+    re.compile(r'(?P<y>\d{4})-(?P<m>\d{1,2})-(?P<d>\d{1,2})'),
+)
+
+
+def parse_dob(value):
+    """
+    Convertir une date de naissance en numéro de jour (date.toordinal)
+
+    Args:
+        value: Texte "JJ/MM/AAAA" ou "AAAA-MM-JJ", date, numéro de jour déjà
+               converti, ou None
+
+    Returns:
+        int: Numéro du jour, 0 si la date est absente ou invalide
+    """
+    if not value:
+        return 0
+    if isinstance(value, int):
+        return value
+    if isinstance(value, date):
+        return value.toordinal()
+    for pattern in DOB_FORMATS:
+        match = pattern.search(str(value))
+        if match:
+            try:
+                return date(int(match['y']), int(match['m']), int(match['d'])).toordinal()
+            except ValueError:
+                return 0
+    return 0
+
+
+def calculate_confidence(text1, text2):
+    """Calculer un score de confiance entre deux chaînes"""
+    return SequenceMatcher(None, text1.upper(), text2.upper()).ratio()
+
+
+# En-têtes reconnus dans les exports CSV de patients (normalisés)
+CSV_COLUMNS = {
+    'id': {'ID', 'IDENTIFIANT', 'NUMERO', 'NUM', 'NO', 'ID PATIENT', 'NUMERO PATIENT'},
+    'nom': {'NOM', 'NOM PATIENT', 'NOM USUEL', 'NOM DE NAISSANCE'},
+    'prenom': {'PRENOM', 'PRENOMS'},
+    'dob': {'DATE NAISSANCE', 'DATE DE NAISSANCE', 'DDN', 'NAISSANCE', 'NE LE'},
+}
+
+# Taille de l'échantillon lu pour détecter encodage, séparateur et en-tête
+CSV_SAMPLE_SIZE = 64 * 1024
+
+
+class PatientFile:
+    """
+    Lecture en continu d'un export CSV de patients
+
+    L'encodage (BOM, UTF-8 ou Windows-1252 des exports Excel), le séparateur
+    (virgule, point-virgule, tabulation) et la ligne d'en-tête sont détectés
+    sur un échantillon. Les lignes commençant par # sont ignorées. Les autres
+    sont ensuite produites une à une sous forme de tuples (id, nom,
+    prenom[, date_naissance]), sans liste intermédiaire: elles alimentent
+    directement PatientStore ou l'index FTS.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self.skipped = 0
+        with open(path, 'rb') as f:
+            sample = f.read(CSV_SAMPLE_SIZE)
+        self.encoding = self._detect_encoding(sample)
+        text = sample.decode(self.encoding, errors='ignore')
+        # Lignes de commentaire (# ...) hors détection du séparateur et de l'en-tête
+        text = ''.join(line for line in text.splitlines(keepends=True)
+                       if not line.lstrip().startswith('#'))
+        try:
+            self.dialect = csv.Sniffer().sniff(text, delimiters=',;\t|')
+        except csv.Error:
+            self.dialect = csv.excel
+        first_row = next(csv.reader(io.StringIO(text), self.dialect), [])
+        self.columns = self._header_columns(first_row)
+        self.has_header = self.columns is not None
+        if not self.has_header:
+            # Sans en-tête: ID,NOM,PRENOM[,JJ/MM/AAAA]
+            self.columns = {'id': 0, 'nom': 1, 'prenom': 2, 'dob': 3}
+
+    @staticmethod
+    def _detect_encoding(sample):
+        """Encodage du fichier d'après son BOM ou la validité UTF-8 de l'échantillon"""
+        if sample.startswith(codecs.BOM_UTF8):
+            return 'utf-8-sig'
+        if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return 'utf-16'
+        try:
+            # Échantillon éventuellement coupé au milieu d'un caractère
+            codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+            return 'utf-8'
+        except UnicodeDecodeError:
+            return 'cp1252'
+
+    @staticmethod
+    def _header_columns(row):
+        """Position des colonnes si la ligne est un en-tête, sinon None"""
+        columns = {}
+        for position, field in enumerate(row):
+            name = normalize_name(field.replace('_', ' '))
+            for column, names in CSV_COLUMNS.items():
+                if name in names and column not in columns:
+                    columns[column] = position
+        if 'nom' not in columns:
+            return None
+        # Colonnes manquantes dans l'en-tête: ordre habituel ID,NOM,PRENOM
+        columns.setdefault('id', 0)
+        columns.setdefault('prenom', columns['nom'] + 1)
+        return columns
+
+    def __iter__(self):
+        with open(self.path, encoding=self.encoding, errors='replace', newline='') as f:
+            yield from self.parse(f, skip_header=self.has_header)
+
+    def parse(self, lines, skip_header=False):
+        """
+        Convertir des lignes CSV en tuples patients
+
+        Args:
+            lines: Fichier ouvert ou liste de lignes (ajouts en fin de fichier)
+            skip_header: Ignorer la première ligne
+
+        Yields:
+            tuple: (id, nom, prenom) ou (id, nom, prenom, date_naissance)
+        """
+        reader = csv.reader(lines, self.dialect)
+        if skip_header:
+            next(reader, None)
+        id_col, nom_col, prenom_col = self.columns['id'], self.columns['nom'], self.columns['prenom']
+        dob_col = self.columns.get('dob')
+        width = max(id_col, nom_col, prenom_col) + 1
+        intern = sys.intern
+        for row in reader:
+            if row and row[0].lstrip().startswith('#'):
+                # Commentaire (exemple_liste_patients.txt)
+                continue
+            if len(row) < width or not row[nom_col].strip():
+                if any(row):
+                    self.skipped += 1
+                continue
+            self.rows += 1
+            # Noms et prénoms partagés entre patients: une seule chaîne en mémoire
+            patient = (row[id_col].strip(), intern(row[nom_col].strip()),
+                       intern(row[prenom_col].strip()))
+            if dob_col is not None and len(row) > dob_col and row[dob_col].strip():
+                patient += (row[dob_col].strip(),)
+            yield patient
+
+
+class NgramIndex:
+    """
+    Index inversé de n-grammes de caractères (trigrammes par défaut)
+
+    Chaque n-gramme pointe vers la liste des positions des noms qui le
+    contiennent. Une requête ne compte que les noms partageant au moins un
+    n-gramme avec elle, au lieu de comparer toute la base.
+    """
+
+    def __init__(self, n=3):
+        self.n = n
+        self.postings = {}
+        self.size = 0
+
+    def grams(self, text):
+        """
+        Découper un texte en n-grammes (avec bordures pour les noms courts)
+
+        Args:
+            text: Nom normalisé
+
+        Returns:
+            set: n-grammes distincts du texte
+        """
+        padded = f"{' ' * (self.n - 1)}{text} "
+        return {padded[i:i + self.n] for i in range(len(padded) - self.n + 1)}
+
+    @classmethod
+    def from_arrays(cls, grams, gram_offsets, postings, n=3):
+        """
+        Recréer l'index à partir de sa forme sérialisée (voir save_index)
+
+        Args:
+            grams: Liste des n-grammes
+            gram_offsets: Début de la liste de chaque n-gramme dans `postings`
+            postings: Positions de tous les n-grammes, bout à bout
+            n: Taille des n-grammes
+        """
+        index = cls(n)
+        for i, gram in enumerate(grams):
+            index.postings[gram] = postings[gram_offsets[i]:gram_offsets[i + 1]]
+        return index
+
+    def copy(self):
+        """
+        Copie modifiable de l'index (listes en `array`, même si l'original
+        est projeté en mémoire), pour y ajouter des noms sans toucher à
+        l'index en cours d'utilisation
+        """
+        index = NgramIndex(self.n)
+        for gram, positions in self.postings.items():
+            postings = index.postings[gram] = array('I')
+            postings.frombytes(memoryview(positions).cast('B'))
+        index.size = self.size
+        return index
+
+    def add(self, position, text):
+        """Indexer un nom à la position donnée"""
+        for gram in self.grams(text):
+            postings = self.postings.get(gram)
+            if postings is None:
+                postings = self.postings[gram] = array('I')
+            postings.append(position)
+        self.size += 1
+
+    def candidates(self, text, limit=NGRAM_CANDIDATES):
+        """
+        Trouver les noms partageant le plus de n-grammes avec le texte
+
+        Args:
+            text: Texte recherché (normalisé)
+            limit: Nombre maximum de candidats retournés
+
+        Returns:
+            list: Positions des candidats, du plus proche au moins proche
+        """
+        counts = Counter()
+        for gram in self.grams(text):
+            postings = self.postings.get(gram)
+            if postings:
+                counts.update(postings)
+        return [position for position, _ in counts.most_common(limit)]
+
+
+def edit_pattern(text):
+    """
+    Préparer un texte pour edit_distance (masques de bits par caractère)
+
+    Le motif peut être réutilisé pour comparer le même texte à beaucoup
+    d'autres chaînes, par exemple tous les nœuds visités dans un BK-tree.
+    """
+    masks = {}
+    for i, char in enumerate(text):
+        masks[char] = masks.get(char, 0) | (1 << i)
+    return text, masks
+
+
+def edit_distance(pattern, other):
+    """
+    Distance de Levenshtein entre un motif préparé et une chaîne
+
+    Algorithme bit-parallèle de Myers/Hyyrö: une opération sur entiers par
+    caractère de `other` au lieu d'une ligne complète de programmation
+    dynamique.
+
+    Args:
+        pattern: Résultat de edit_pattern()
+        other: Chaîne à comparer
+
+    Returns:
+        int: Nombre minimal d'insertions, suppressions et substitutions
+    """
+    text, masks = pattern
+    length = len(text)
+    if not length:
+        return len(other)
+    if text == other:
+        return 0
+
+    full = (1 << length) - 1
+    last = 1 << (length - 1)
+    pv = full
+    mv = 0
+    score = length
+    for char in other:
+        eq = masks.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & full
+        mv = ph & xv
+    return score
+
+
+class BKTree:
+    """
+    Arbre métrique (Burkhard-Keller) sur la distance d'édition
+
+    Chaque nœud est une liste [clé, positions, enfants] où `enfants` associe
+    une distance au sous-arbre correspondant. L'inégalité triangulaire
+    permet d'ignorer les sous-arbres trop éloignés de la requête.
+    """
+
+    def __init__(self):
+        self.root = None
+
+    def add(self, position, key):
+        """Indexer une clé normalisée à la position donnée"""
+        if self.root is None:
+            self.root = [key, [position], {}]
+            return
+
+        pattern = edit_pattern(key)
+        node = self.root
+        while True:
+            distance = edit_distance(pattern, node[0])
+            if distance == 0:
+                node[1].append(position)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [key, [position], {}]
+                return
+            node = child
+
+    def search(self, key, max_distance=BKTREE_MAX_DISTANCE):
+        """
+        Trouver toutes les clés à une distance d'édition <= max_distance
+
+        Args:
+            key: Texte recherché (normalisé)
+            max_distance: Distance maximale acceptée
+
+        Returns:
+            list: Couples (distance, position), du plus proche au plus éloigné
+        """
+        if self.root is None:
+            return []
+
+        pattern = edit_pattern(key)
+        results = []
+        stack = [self.root]
+        while stack:
+            node_key, positions, children = stack.pop()
+            distance = edit_distance(pattern, node_key)
+            if distance <= max_distance:
+                results.extend((distance, position) for position in positions)
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(child for d, child in children.items() if low <= d <= high)
+        results.sort()
+        return results
+
+    def arrays(self):
+        """
+        Forme sérialisée de l'arbre (voir save_index)
+
+        Les nœuds sont numérotés en largeur; chacun est décrit par ses
+        positions (la clé est celle du premier patient) et ses enfants.
+
+        Returns:
+            tuple: (clés pour l'en-tête, dict nom de section -> array)
+        """
+        position_offsets, positions = array('I', [0]), array('I')
+        child_offsets, child_distances, child_nodes = array('I', [0]), array('I'), array('I')
+        nodes = [self.root] if self.root is not None else []
+        for _, node_positions, children in nodes:
+            positions.extend(node_positions)
+            position_offsets.append(len(positions))
+            for distance, child in children.items():
+                child_distances.append(distance)
+                child_nodes.append(len(nodes))
+                nodes.append(child)
+            child_offsets.append(len(child_distances))
+        return [], {
+            'bktree_position_offsets': position_offsets,
+            'bktree_positions': positions,
+            'bktree_child_offsets': child_offsets,
+            'bktree_child_distances': child_distances,
+            'bktree_child_nodes': child_nodes,
+        }
+
+    @classmethod
+    def from_arrays(cls, keys, section, names):
+        """BK-tree projeté en mémoire (voir MappedBKTree)"""
+        return MappedBKTree(names, *(section(name) for name in (
+            'bktree_position_offsets', 'bktree_positions', 'bktree_child_offsets',
+            'bktree_child_distances', 'bktree_child_nodes')))
+
+
+class MappedBKTree:
+    """
+    BK-tree lu depuis un index sur disque (voir BKTree.arrays)
+
+    La recherche parcourt directement les tableaux projetés en mémoire:
+    rien n'est reconstruit au démarrage. Les clés des nœuds sont lues dans
+    le stockage des patients.
+    """
+
+    def __init__(self, names, position_offsets, positions, child_offsets,
+                 child_distances, child_nodes):
+        self.names = names
+        self.position_offsets = position_offsets
+        self.positions = positions
+        self.child_offsets = child_offsets
+        self.child_distances = child_distances
+        self.child_nodes = child_nodes
+
+    def search(self, key, max_distance=BKTREE_MAX_DISTANCE):
+        """Même résultat que BKTree.search"""
+        if len(self.position_offsets) < 2:
+            return []
+
+        pattern = edit_pattern(key)
+        results = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            first, last = self.position_offsets[node], self.position_offsets[node + 1]
+            distance = edit_distance(pattern, self.names[self.positions[first]])
+            if distance <= max_distance:
+                results.extend((distance, position) for position in self.positions[first:last])
+            low, high = distance - max_distance, distance + max_distance
+            for child in range(self.child_offsets[node], self.child_offsets[node + 1]):
+                if low <= self.child_distances[child] <= high:
+                    stack.append(self.child_nodes[child])
+        results.sort()
+        return results
+
+    def arrays(self):
+        return [], {
+            'bktree_position_offsets': self.position_offsets,
+            'bktree_positions': self.positions,
+            'bktree_child_offsets': self.child_offsets,
+            'bktree_child_distances': self.child_distances,
+            'bktree_child_nodes': self.child_nodes,
+        }
+
+
+# Graphies françaises ramenées à un même son avant le codage phonétique
+PHONETIC_RULES = [
+    (re.compile(r'SCH|CH|SH'), 'S'),
+    (re.compile(r'PH'), 'F'),
+    (re.compile(r'BV'), 'V'),
+    (re.compile(r'QU|CK'), 'K'),
+    (re.compile(r'C(?=[EIY])'), 'S'),
+    (re.compile(r'G(?=[EIY])'), 'J'),
+    (re.compile(r'GU'), 'G'),
+]
+
+# Classes de consonnes (voyelles, H, W et Y ignorés)
+PHONETIC_CODES = str.maketrans({
+    'B': '1', 'P': '1',
+    'C': '2', 'K': '2', 'Q': '2', 'G': '2',
+    'D': '3', 'T': '3',
+    'L': '4',
+    'M': '5', 'N': '5',
+    'R': '6',
+    'J': '7',
+    'S': '8', 'X': '8', 'Z': '8',
+    'F': '9', 'V': '9',
+})
+
+# Lettres finales généralement muettes en français (DUPONT, DUBOIS, ROUX)
+PHONETIC_SILENT_ENDINGS = 'ESTDXZ'
+
+
+def phonetic_key(word):
+    """
+    Calculer une clé phonétique française de type Soundex
+
+    GAUTIER et GAUTHIER, DUPON et DUPONT, FILIPE et PHILIPPE partagent la
+    même clé : première lettre conservée puis au plus trois classes de
+    consonnes, une même classe répétée n'étant codée qu'une fois.
+
+    Args:
+        word: Mot normalisé (voir normalize_name)
+
+    Returns:
+        str: Clé phonétique, vide si le mot ne contient aucune lettre
+    """
+    word = re.sub(r'[^A-Z]', '', word)
+    if not word:
+        return ''
+    for pattern, replacement in PHONETIC_RULES:
+        word = pattern.sub(replacement, word)
+    word = word[0] + word[1:].rstrip(PHONETIC_SILENT_ENDINGS)
+
+    key = word[0]
+    previous = word[0].translate(PHONETIC_CODES)
+    for char in word[1:]:
+        code = char.translate(PHONETIC_CODES)
+        if code.isdigit() and code != previous:
+            key += code
+            if len(key) == 4:
+                break
+            previous = code
+    return key
+
+
+class PhoneticIndex:
+    """
+    Seaux de patients par clé phonétique du nom et du prénom
+
+    Une requête interroge le seau de chacune de ses clés ainsi que les seaux
+    voisins (clés identiques à la dernière consonne près).
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.neighbours = {}
+
+    def add(self, position, text):
+        """Indexer chaque mot d'un nom normalisé à la position donnée"""
+        for word in text.split():
+            key = phonetic_key(word)
+            if not key:
+                continue
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = []
+                self.neighbours.setdefault(key[:-1], []).append(key)
+            bucket.append(position)
+
+    def candidates(self, text, limit=NGRAM_CANDIDATES):
+        """
+        Trouver les patients dont le nom sonne comme le texte
+
+        Args:
+            text: Texte recherché (normalisé)
+            limit: Nombre maximum de candidats retournés
+
+        Returns:
+            list: Positions des candidats, du plus proche au moins proche
+        """
+        return [position for position, _ in self.counts(text).most_common(limit)]
+
+    def arrays(self):
+        """Forme sérialisée des seaux (voir save_index)"""
+        keys, offsets, postings = _postings_arrays(self.buckets)
+        return keys, {'phonetic_offsets': offsets, 'phonetic_postings': postings}
+
+    @classmethod
+    def from_arrays(cls, keys, section, names):
+        """Recréer l'index à partir de sa forme sérialisée (sans recalcul des clés)"""
+        index = cls()
+        index.buckets = _postings_dict(keys, section('phonetic_offsets'), section('phonetic_postings'))
+        for key in keys:
+            index.neighbours.setdefault(key[:-1], []).append(key)
+        return index
+
+    def counts(self, text):
+        """Poids de chaque patient pour le texte (voir candidates)"""
+        counts = Counter()
+        for word in text.split():
+            key = phonetic_key(word)
+            if not key:
+                continue
+            # Même clé: poids double, clés voisines: poids simple
+            bucket = self.buckets.get(key, ())
+            counts.update(bucket)
+            counts.update(bucket)
+            for neighbour in self.neighbours.get(key[:-1], ()):
+                if neighbour != key:
+                    counts.update(self.buckets[neighbour])
+        return counts
+
+
+def token_score(query_tokens, patient_tokens):
+    """
+    Score de similarité indépendant de l'ordre des mots
+
+    Chaque mot du patient est aligné sur le mot le plus proche de la requête ;
+    les mots supplémentaires de la requête (second prénom) sont ignorés.
+
+    Args:
+        query_tokens: Mots normalisés du texte extrait
+        patient_tokens: Mots normalisés du nom du patient
+
+    Returns:
+        float: Moyenne des similarités, pondérée par la longueur des mots
+    """
+    total = 0.0
+    length = 0
+    for patient_token in patient_tokens:
+        best = max(SequenceMatcher(None, patient_token, query_token).ratio()
+                   for query_token in query_tokens)
+        total += best * len(patient_token)
+        length += len(patient_token)
+    return total / length if length else 0.0
+
+
+class TokenIndex:
+    """
+    Index des patients par ensemble de mots
+
+    Chaque patient est rangé sous sa signature (mots triés) et sous chacun de
+    ses mots : "Jean DUPONT", "DUPONT Jean" ou "DUPONT Jean Pierre" sont
+    résolus sans dépendre de l'ordre.
+    """
+
+    def __init__(self):
+        self.signatures = {}
+        self.postings = {}
+
+    def add(self, position, text):
+        """Indexer un nom normalisé à la position donnée"""
+        words = text.split()
+        self.signatures.setdefault(' '.join(sorted(words)), []).append(position)
+        for word in set(words):
+            self.postings.setdefault(word, []).append(position)
+
+    def lookup(self, words):
+        """Patients dont l'ensemble de mots est exactement celui de la requête"""
+        positions = self.signatures.get(' '.join(sorted(words)), [])
+        return positions if isinstance(positions, list) else [positions]
+
+    def arrays(self):
+        """
+        Forme sérialisée (voir save_index): signatures et mots triés dans des
+        tampons (SortedKeyIndex), listes de positions bout à bout
+        """
+        words, offsets, postings = _postings_arrays(self.postings)
+        word_keys, word_key_offsets, word_numbers = _sorted_key_arrays(
+            (word, number) for number, word in enumerate(words))
+        keys, key_offsets, positions = _sorted_key_arrays(self.signatures.items())
+        return [], {
+            'token_words': word_keys,
+            'token_word_offsets': word_key_offsets,
+            'token_word_numbers': word_numbers,
+            'token_offsets': offsets,
+            'token_postings': postings,
+            'token_signatures': keys,
+            'token_signature_offsets': key_offsets,
+            'token_signature_positions': positions,
+        }
+
+    @classmethod
+    def from_arrays(cls, keys, section, names):
+        """Index lu depuis sa forme sérialisée, sans rien reconstruire (voir arrays)"""
+        index = cls()
+        words = SortedKeyIndex(section('token_words'), section('token_word_offsets'),
+                               section('token_word_numbers'))
+        index.postings = MappedPostings(words, section('token_offsets'), section('token_postings'))
+        index.signatures = SortedKeyIndex(section('token_signatures'), section('token_signature_offsets'),
+                                          section('token_signature_positions'))
+        return index
+
+    def candidates(self, words, limit=NGRAM_CANDIDATES):
+        """
+        Trouver les patients partageant le plus de mots avec la requête
+
+        Args:
+            words: Mots normalisés de la requête
+            limit: Nombre maximum de candidats retournés
+
+        Returns:
+            list: Positions des candidats, du plus proche au moins proche
+        """
+        return [position for position, _ in self.counts(words).most_common(limit)]
+
+    def counts(self, words):
+        """Nombre de mots de la requête partagés par chaque patient"""
+        counts = Counter()
+        for word in set(words):
+            postings = self.postings.get(word)
+            if postings:
+                counts.update(postings)
+        return counts
+
+
+class LayeredIndex:
+    """
+    Index optionnel (BKTree, PhoneticIndex, TokenIndex) complété en mémoire
+
+    Même principe que LayeredKeyIndex pour le rafraîchissement à chaud: les
+    patients ajoutés vont dans un petit index `added` du même type, l'index
+    d'origine (`base`, qui couvre les `size` premiers patients) n'est ni
+    reconstruit ni modifié.
+    """
+
+    def __init__(self, base, added, size):
+        self.base = base
+        self.added = added
+        self.size = size
+
+    def search(self, key, max_distance=BKTREE_MAX_DISTANCE):
+        return sorted(self.base.search(key, max_distance) + self.added.search(key, max_distance))
+
+    def lookup(self, words):
+        return list(self.base.lookup(words)) + list(self.added.lookup(words))
+
+    def counts(self, query):
+        counts = self.base.counts(query)
+        counts.update(self.added.counts(query))
+        return counts
+
+    def candidates(self, query, limit=NGRAM_CANDIDATES):
+        return [position for position, _ in self.counts(query).most_common(limit)]
+
+
+# Index propre à chaque mode de recherche: attribut de PatientMatcher et classe
+OPTIONAL_INDEXES = {
+    # Distance d'édition (fautes de frappe OCR)
+    'bktree': ('bktree', BKTree),
+    # Clés phonétiques (voyelles et doubles consonnes)
+    'phonetic': ('phonetic_index', PhoneticIndex),
+    # Ensemble de mots (ordre NOM/PRENOM indifférent)
+    'tokens': ('token_index', TokenIndex),
+}
+
+
+class PatientStore(Sequence):
+    """
+    Stockage compact des patients pour les bases de 100 000 patients et plus
+
+    Au lieu d'un tuple et de trois chaînes Python par patient, tous les champs
+    sont concaténés en UTF-8 dans un seul tampon et repérés par des décalages
+    dans un tableau `array`. Les clés normalisées ont leur propre tampon. Un
+    patient n'est reconstruit en tuple (id, nom, prenom) qu'à la lecture, ce
+    qui garde le contrat de PatientDatabase.find_patient. Les tampons peuvent
+    aussi être des vues sur un fichier d'index projeté en mémoire (mmap).
+
+    Un 4e champ facultatif (date de naissance) est conservé à part, en numéro
+    de jour (0 si inconnue), pour départager les homonymes.
+
+    L'identifiant est rendu avec son type d'origine, patient par patient: un
+    entier (id SQLite) reste un entier même si d'autres patients ont un
+    identifiant texte. Les autres types sont rendus en chaîne.
+    """
+
+    __slots__ = ('fields', 'field_offsets', 'keys', 'key_offsets', 'dobs', 'int_ids')
+
+    def __init__(self, patients=()):
+        fields = bytearray()
+        keys = bytearray()
+        field_offsets = array('I', [0])
+        key_offsets = array('I', [0])
+        dobs = array('I')
+        int_ids = array('B')
+        for patient in patients:
+            patient_id, nom, prenom = patient[0], patient[1], patient[2]
+            int_ids.append(isinstance(patient_id, int))
+            for field in (str(patient_id), nom, prenom):
+                fields += field.encode('utf-8')
+                field_offsets.append(len(fields))
+            keys += patient_key(nom, prenom).encode('utf-8')
+            key_offsets.append(len(keys))
+            dobs.append(parse_dob(patient[3]) if len(patient) > 3 else 0)
+
+        self.fields = bytes(fields)
+        self.field_offsets = field_offsets
+        self.keys = bytes(keys)
+        self.key_offsets = key_offsets
+        self.dobs = dobs
+        # 1 si l'identifiant était un entier (SQLite), 0 pour une chaîne (fichier texte)
+        self.int_ids = int_ids
+
+    @classmethod
+    def from_buffers(cls, fields, field_offsets, keys, key_offsets, dobs, int_ids):
+        """Recréer un stockage à partir de tampons existants (index sur disque)"""
+        store = cls.__new__(cls)
+        store.fields = fields
+        store.field_offsets = field_offsets
+        store.keys = keys
+        store.key_offsets = key_offsets
+        store.dobs = dobs
+        store.int_ids = int_ids
+        return store
+
+    def __len__(self):
+        return len(self.key_offsets) - 1
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return self._record(position * 3)
+
+    def __iter__(self):
+        for base in range(0, len(self.field_offsets) - 1, 3):
+            yield self._record(base)
+
+    def _record(self, base):
+        """Reconstruire le tuple (id, nom, prenom) à partir de son 1er champ"""
+        fields, offsets = self.fields, self.field_offsets
+        patient_id = str(fields[offsets[base]:offsets[base + 1]], 'utf-8')
+        return (int(patient_id) if self.int_ids[base // 3] else patient_id,
+                str(fields[offsets[base + 1]:offsets[base + 2]], 'utf-8'),
+                str(fields[offsets[base + 2]:offsets[base + 3]], 'utf-8'))
+
+    def extended(self, patients):
+        """
+        Nouveau stockage contenant ces patients puis les nouveaux
+
+        Les tampons existants sont recopiés tels quels: seuls les nouveaux
+        patients sont encodés et normalisés.
+
+        Args:
+            patients: Nouveaux tuples (id, nom, prenom)
+
+        Returns:
+            PatientStore: Le stockage d'origine n'est pas modifié
+        """
+        extra = PatientStore(patients)
+        if not len(extra):
+            return self
+        if not len(self):
+            return extra
+
+        field_offsets = array('I')
+        field_offsets.frombytes(memoryview(self.field_offsets).cast('B'))
+        field_offsets.extend(offset + len(self.fields) for offset in extra.field_offsets[1:])
+        key_offsets = array('I')
+        key_offsets.frombytes(memoryview(self.key_offsets).cast('B'))
+        key_offsets.extend(offset + len(self.keys) for offset in extra.key_offsets[1:])
+        dobs = array('I')
+        dobs.frombytes(memoryview(self.dobs).cast('B'))
+        dobs.extend(extra.dobs)
+        int_ids = array('B', bytes(self.int_ids))
+        int_ids.extend(extra.int_ids)
+        return PatientStore.from_buffers(bytes(self.fields) + extra.fields, field_offsets,
+                                         bytes(self.keys) + extra.keys, key_offsets, dobs,
+                                         int_ids)
+
+    def key(self, position):
+        """Clé normalisée "NOM PRENOM" du patient"""
+        return str(self.keys[self.key_offsets[position]:self.key_offsets[position + 1]], 'utf-8')
+
+    def key_view(self):
+        """Séquence des clés normalisées, extraites à la demande"""
+        return _KeyView(self)
+
+    def nbytes(self):
+        """Taille des données en mémoire (octets)"""
+        return (len(self.fields) + len(self.keys)
+                + self.field_offsets.itemsize * len(self.field_offsets)
+                + self.key_offsets.itemsize * len(self.key_offsets)
+                + self.dobs.itemsize * len(self.dobs) + len(self.int_ids))
+
+
+class _KeyView(Sequence):
+    """Vue en lecture seule sur les clés normalisées d'un PatientStore"""
+
+    __slots__ = ('store',)
+
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self.store.key(i) for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return self.store.key(position)
+
+    def __iter__(self):
+        keys, offsets = self.store.keys, self.store.key_offsets
+        for i in range(len(offsets) - 1):
+            yield str(keys[offsets[i]:offsets[i + 1]], 'utf-8')
+
+
+class LookupCache:
+    """
+    Cache LRU borné des résultats de recherche de patients
+
+    Les mêmes patients reviennent souvent (bilans mensuels) avec le même
+    texte OCR : la recherche floue n'est alors faite qu'une fois. Le cache
+    doit être vidé à chaque rechargement de la base; il peut être partagé
+    avec le fil de rafraîchissement (verrou interne).
+    """
+
+    def __init__(self, maxsize=LOOKUP_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+        self.lock = threading.Lock()
+
+    def get(self, key, owner=None):
+        """
+        Résultat mémorisé pour la clé, ou None
+
+        Args:
+            key: Clé de la recherche
+            owner: Index attendu; une entrée (index, résultat) produite par
+                   un autre index (remplacé depuis) est évincée et comptée
+                   comme un défaut
+        """
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None and owner is not None and value[0] is not owner:
+                del self.entries[key]
+                value = None
+            if value is None:
+                self.stats['misses'] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return value
+
+    def put(self, key, value):
+        """Mémoriser un résultat, en évinçant le moins récemment utilisé"""
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        """Invalider tous les résultats (base patients rechargée)"""
+        with self.lock:
+            self.entries.clear()
+            self.stats['invalidations'] += 1
+
+    def hit_rate(self):
+        """Proportion des recherches servies par le cache"""
+        total = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / total if total else 0.0
+
+
+def best_matches(name_text, candidates, k):
+    """
+    Scorer des candidats (SequenceMatcher) et garder les k meilleurs
+
+    Les filtres rapides real_quick_ratio/quick_ratio écartent les candidats
+    qui ne peuvent pas atteindre MATCH_CUTOFF avant le calcul complet.
+
+    Args:
+        name_text: Texte recherché (normalisé)
+        candidates: Couples (position, clé normalisée)
+        k: Nombre de résultats
+
+    Returns:
+        list: Couples (score, position), du meilleur au moins bon
+    """
+    matcher = SequenceMatcher()
+    matcher.set_seq2(name_text)
+    scored = []
+    for position, name in candidates:
+        matcher.set_seq1(name)
+        if (matcher.real_quick_ratio() >= MATCH_CUTOFF
+                and matcher.quick_ratio() >= MATCH_CUTOFF):
+            score = matcher.ratio()
+            if score >= MATCH_CUTOFF:
+                scored.append((score, position))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return scored[:k]
+
+
+def prefer_dob(candidates, dob_candidates, k):
+    """
+    Départager par la date de naissance des candidats de même score
+
+    Les patients nés le jour lu sur le document passent devant les autres
+    patients de même score (homonymes), sans jamais devancer un nom plus
+    proche du texte: une date mal attribuée ne peut pas faire préférer
+    DUPOND Jeanne à DUPONT Jean.
+
+    Args:
+        candidates: Couples (patient, score) de la recherche habituelle
+        dob_candidates: Couples (patient, score) parmi les patients nés ce jour
+        k: Nombre de résultats
+
+    Returns:
+        list: Triplets (patient, score, né_ce_jour), du meilleur au moins bon
+    """
+    born = {patient[0] for patient, _ in dob_candidates}
+    merged = {}
+    for patient, score in list(candidates) + list(dob_candidates):
+        if patient[0] not in merged or score > merged[patient[0]][1]:
+            merged[patient[0]] = (patient, score)
+    ranked = sorted(merged.values(), key=lambda item: (-item[1], item[0][0] not in born))
+    return [(patient, score, patient[0] in born) for patient, score in ranked[:k]]
+
+
+def _add_exact(exact, patient, name, position):
+    """
+    Enregistrer les clés exactes "NOM PRENOM" et "PRENOM NOM" d'un patient
+
+    Les listes d'homonymes sont remplacées et non modifiées en place: un dict
+    recopié par PatientMatcher.extended ne partage rien avec l'original.
+    """
+    for key in {name, patient_key(patient[2], patient[1])}:
+        existing = exact.get(key)
+        if existing is None:
+            exact[key] = position
+        elif isinstance(existing, list):
+            exact[key] = existing + [position]
+        else:
+            exact[key] = [existing, position]
+
+
+class PatientMatcher:
+    """
+    Recherche floue des patients à partir d'index construits au chargement
+
+    Les patients sont des tuples (id, nom, prenom) tels que chargés par
+    PatientDatabase, ou directement un PatientStore.
+    """
+
+    def __init__(self, patients, mode='ngram', candidate_limit=NGRAM_CANDIDATES,
+                 max_distance=BKTREE_MAX_DISTANCE):
+        # Stockage compact: un tampon de texte au lieu d'un tuple par patient
+        store = patients if isinstance(patients, PatientStore) else PatientStore(patients)
+        self._configure(store, mode, candidate_limit, max_distance)
+
+        self.ngram_index = NgramIndex()
+        # Correspondances exactes "NOM PRENOM" et "PRENOM NOM" -> position
+        # (liste de positions seulement pour les homonymes)
+        self.exact = {}
+        for position, (patient, name) in enumerate(zip(self.patients, self.names)):
+            self.ngram_index.add(position, name)
+            _add_exact(self.exact, patient, name, position)
+
+        self._build_optional_indexes()
+
+    @classmethod
+    def from_index(cls, store, ngram_index, exact, mode='ngram',
+                   candidate_limit=NGRAM_CANDIDATES, max_distance=BKTREE_MAX_DISTANCE,
+                   optional=None, optional_size=0):
+        """
+        Recréer un PatientMatcher à partir d'index déjà construits
+
+        Args:
+            store: PatientStore des patients
+            ngram_index: NgramIndex correspondant
+            exact: Correspondances exactes (dict ou SortedKeyIndex)
+            mode: Mode de recherche (voir MATCHING_MODES)
+            optional: Index propre au mode, construit pour les `optional_size`
+                      premiers patients (None: construit ici)
+
+        Returns:
+            PatientMatcher: Prêt à l'emploi, sans reconstruction des index communs
+        """
+        matcher = cls.__new__(cls)
+        matcher._configure(store, mode, candidate_limit, max_distance)
+        matcher.ngram_index = ngram_index
+        matcher.exact = exact
+        matcher._build_optional_indexes(optional, optional_size)
+        return matcher
+
+    def extended(self, patients):
+        """
+        Nouveau PatientMatcher incluant des patients ajoutés à la base
+
+        Seuls les nouveaux patients sont normalisés et indexés; le matcher
+        courant reste intact et utilisable pendant la construction, ce qui
+        permet de le remplacer d'un bloc une fois le nouveau prêt. Les
+        tampons et l'index de trigrammes sont recopiés (copie d'octets);
+        l'index propre au mode (BK-tree, phonétique, mots) est partagé et
+        complété par une petite couche des ajouts (LayeredIndex).
+
+        Args:
+            patients: Nouveaux tuples (id, nom, prenom)
+
+        Returns:
+            PatientMatcher: Même mode et mêmes paramètres que celui-ci
+        """
+        start = len(self.patients)
+        store = self.patients.extended(patients)
+        ngram_index = self.ngram_index.copy()
+
+        # Index exact: dict recopié, ou surcouche d'un index sur disque
+        if isinstance(self.exact, dict):
+            exact = added = dict(self.exact)
+        elif isinstance(self.exact, LayeredKeyIndex):
+            exact = LayeredKeyIndex(self.exact.base, dict(self.exact.added))
+            added = exact.added
+        else:
+            exact = LayeredKeyIndex(self.exact, {})
+            added = exact.added
+
+        names = store.key_view()
+        for position in range(start, len(store)):
+            name = names[position]
+            ngram_index.add(position, name)
+            _add_exact(added, store[position], name, position)
+
+        # Index propre au mode: complété par une couche, jamais reconstruit
+        optional = None
+        if self.mode in OPTIONAL_INDEXES:
+            optional = getattr(self, OPTIONAL_INDEXES[self.mode][0])
+        return PatientMatcher.from_index(store, ngram_index, exact, self.mode,
+                                         self.candidate_limit, self.max_distance,
+                                         optional, start)
+
+    def _configure(self, store, mode, candidate_limit, max_distance):
+        """Paramètres et état communs à tous les modes de construction"""
+        if mode not in MATCHING_MODES:
+            raise ValueError(f"Mode de recherche inconnu: {mode}")
+        self.patients = store
+        self.mode = mode
+        self.candidate_limit = candidate_limit
+        self.max_distance = max_distance
+        # Clés normalisées calculées une seule fois par patient (PatientStore)
+        self.names = store.key_view()
+        self._arrays = None
+        self._dob_index = None
+        self.stats = {'lookups': 0, 'exact_hits': 0, 'dob_hits': 0}
+
+    def _build_optional_indexes(self, previous=None, start=0):
+        """
+        Construire l'index propre au mode de recherche choisi
+
+        Args:
+            previous: Index optionnel déjà construit pour les `start` premiers
+                      patients (rafraîchissement à chaud): seuls les suivants
+                      sont indexés, dans une couche ajoutée (LayeredIndex)
+            start: Nombre de patients couverts par `previous`
+        """
+        self.bktree = self.phonetic_index = self.token_index = None
+        if self.mode not in OPTIONAL_INDEXES:
+            return
+        attribute, index_class = OPTIONAL_INDEXES[self.mode]
+        if isinstance(previous, LayeredIndex):
+            # Couche des ajouts précédents refaite: elle reste petite, et
+            # les couches ne s'empilent pas d'un rafraîchissement à l'autre
+            previous, start = previous.base, previous.size
+        names = self.names
+        if previous is not None and start >= len(names):
+            # Index chargé depuis le disque, à jour
+            setattr(self, attribute, previous)
+            return
+        index = index_class()
+        for position in range(start if previous is not None else 0, len(names)):
+            index.add(position, names[position])
+        if previous is not None:
+            index = LayeredIndex(previous, index, start)
+        setattr(self, attribute, index)
+
+    def find(self, name_text):
+        """
+        Trouver le patient correspondant au texte extrait
+
+        Args:
+            name_text: Texte brut contenant potentiellement un nom
+
+        Returns:
+            tuple: (patient_id, nom, prenom, score_confiance) ou None
+        """
+        candidates = self.find_candidates(name_text, k=1)
+        if not candidates:
+            return None
+        patient, confidence = candidates[0]
+        return (patient[0], patient[1], patient[2], confidence)
+
+    def find_candidates(self, name_text, k=3, dob=None, with_dob=False):
+        """
+        Trouver les k meilleurs patients en une seule passe de scoring
+
+        Args:
+            name_text: Texte brut contenant potentiellement un nom
+            k: Nombre maximum de candidats retournés
+            dob: Date de naissance lue sur le document (facultative)
+            with_dob: Retourner aussi, pour chaque patient, s'il est né ce jour
+
+        Returns:
+            list: Couples (patient, score_confiance), ou triplets (patient,
+                  score_confiance, né_ce_jour) avec with_dob, du meilleur au
+                  moins bon
+        """
+        name_text = normalize_name(name_text)
+        self.stats['lookups'] += 1
+        candidates = self._search(name_text, k)
+
+        # Date de naissance connue: elle ne fait que départager les candidats
+        # de même score (homonymes), jamais préférer un nom moins proche
+        dob = parse_dob(dob)
+        if dob:
+            candidates = prefer_dob(candidates, self._rank(name_text, self.dob_positions(dob), k), k)
+            if candidates and candidates[0][2]:
+                self.stats['dob_hits'] += 1
+        else:
+            candidates = [(patient, score, False) for patient, score in candidates]
+        if with_dob:
+            return candidates
+        return [(patient, score) for patient, score, _ in candidates]
+
+    def _search(self, name_text, k):
+        """Recherche habituelle: correspondance exacte, sinon matching flou"""
+        # Chemin rapide: nom imprimé proprement, pas de matching flou
+        positions = self.exact_positions(name_text)
+        if positions:
+            self.stats['exact_hits'] += 1
+            return [(self.patients[position], 1.0) for position in positions[:k]]
+
+        if self.mode == 'tokens':
+            return self._token_candidates(name_text, k)
+
+        positions = self.candidate_positions(name_text)
+        if self.mode == 'phonetic':
+            # Seaux phonétiques tronqués à candidate_limit dans un ordre
+            # arbitraire entre ex aequo, mots collés ou consonne mal lue:
+            # les candidats des trigrammes sont toujours ajoutés, sans quoi
+            # un patient proche mais coupé laisse passer un mauvais patient
+            positions = set(positions)
+            positions.update(self.ngram_index.candidates(name_text, self.candidate_limit))
+        return self._rank(name_text, positions, k)
+
+    def find_by_id(self, patient_id, name_text):
+        """
+        Patient d'identifiant donné parmi ceux portant exactement ce nom
+
+        Permet de vérifier en temps constant qu'un patient connu par ailleurs
+        (alias appris) existe toujours sous ce nom.
+
+        Returns:
+            tuple: (patient_id, nom, prenom) ou None
+        """
+        for position in self.exact_positions(normalize_name(name_text)):
+            patient = self.patients[position]
+            if str(patient[0]) == str(patient_id):
+                return patient
+        return None
+
+    def dob_positions(self, dob):
+        """Positions des patients nés ce jour (index construit au 1er usage)"""
+        if self._dob_index is None:
+            index = {}
+            for position, day in enumerate(self.patients.dobs):
+                if day:
+                    index.setdefault(day, []).append(position)
+            self._dob_index = index
+        return self._dob_index.get(dob, [])
+
+    def exact_positions(self, name_text):
+        """Positions des patients dont le nom normalisé est exactement le texte"""
+        positions = self.exact.get(name_text)
+        if positions is None:
+            return []
+        return positions if isinstance(positions, list) else [positions]
+
+    def _token_candidates(self, name_text, k):
+        """Recherche indépendante de l'ordre des mots (mode "tokens")"""
+        words = name_text.split()
+        if not words:
+            return []
+
+        # Mêmes mots dans un autre ordre (noms composés, prénoms multiples)
+        positions = self.token_index.lookup(words)
+        if positions:
+            self.stats['exact_hits'] += 1
+            return [(self.patients[position], 1.0) for position in positions[:k]]
+
+        # Sinon, patients partageant des mots ou des trigrammes (fautes OCR)
+        positions = set(self.token_index.candidates(words, self.candidate_limit))
+        positions.update(self.ngram_index.candidates(name_text, self.candidate_limit))
+        scored = []
+        for position in positions:
+            score = token_score(words, self.names[position].split())
+            if score >= MATCH_CUTOFF:
+                scored.append((score, position))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(self.patients[position], score) for score, position in scored[:k]]
+
+    def find_batch(self, names, k=1):
+        """
+        Trouver les patients correspondant à plusieurs textes extraits
+
+        Les trigrammes de toutes les requêtes sont comptés contre toute la
+        base en une opération NumPy par bloc de requêtes (coefficient de
+        Dice), puis seuls les meilleurs candidats sont scorés finement.
+
+        Args:
+            names: Textes bruts contenant potentiellement un nom
+            k: Nombre de résultats par texte
+
+        Returns:
+            list: Pour chaque texte, liste de couples (patient, score_confiance)
+                  du meilleur au moins bon, vide si aucun patient ne correspond
+        """
+        results = [[] for _ in names]
+        queries = []
+        for i, name in enumerate(names):
+            name_text = normalize_name(name)
+            self.stats['lookups'] += 1
+            positions = self.exact_positions(name_text)
+            if positions:
+                self.stats['exact_hits'] += 1
+                results[i] = [(self.patients[position], 1.0) for position in positions[:k]]
+            else:
+                queries.append((i, name_text))
+
+        if not queries or not self.patients:
+            return results
+
+        if np is None:
+            for i, name_text in queries:
+                positions = self.ngram_index.candidates(name_text, self.candidate_limit)
+                results[i] = self._rank(name_text, positions, k)
+            return results
+
+        postings, gram_counts = self._ngram_arrays()
+        size = len(self.patients)
+        top = min(self.candidate_limit, size)
+        chunk = max(1, BATCH_CELLS // size)
+        for start in range(0, len(queries), chunk):
+            block = queries[start:start + chunk]
+
+            # Comptage des trigrammes partagés: une ligne par requête
+            hits = [np.empty(0, dtype=np.int64)]
+            query_counts = np.empty(len(block))
+            for row, (_, name_text) in enumerate(block):
+                grams = self.ngram_index.grams(name_text)
+                query_counts[row] = len(grams)
+                offset = row * size
+                hits.extend(postings[g] + offset for g in grams if g in postings)
+            shared = np.bincount(np.concatenate(hits), minlength=len(block) * size)
+            shared = shared.reshape(len(block), size)
+
+            dice = 2 * shared / (query_counts[:, None] + gram_counts[None, :])
+            best = np.argpartition(-dice, top - 1, axis=1)[:, :top]
+            for row, (i, name_text) in enumerate(block):
+                results[i] = self._rank(name_text, best[row].tolist(), k)
+
+        return results
+
+    def _ngram_arrays(self):
+        """Listes de l'index de trigrammes converties en tableaux NumPy"""
+        if self._arrays is None:
+            postings = {gram: np.frombuffer(positions, dtype=np.uint32).astype(np.int64)
+                        for gram, positions in self.ngram_index.postings.items()}
+            gram_counts = np.array([len(self.ngram_index.grams(name)) for name in self.names],
+                                   dtype=np.float64)
+            self._arrays = (postings, gram_counts)
+        return self._arrays
+
+    def _rank(self, name_text, positions, k):
+        """
+        Scorer des candidats et garder les k meilleurs
+
+        Args:
+            name_text: Texte recherché (normalisé)
+            positions: Positions des candidats
+            k: Nombre de résultats
+
+        Returns:
+            list: Couples (patient, score_confiance), du meilleur au moins bon
+        """
+        names = self.names
+        scored = best_matches(name_text, ((position, names[position]) for position in set(positions)), k)
+        return [(self.patients[position], score) for score, position in scored]
+
+    def candidate_positions(self, name_text):
+        """
+        Réduire la recherche à un petit ensemble de patients candidats
+
+        Args:
+            name_text: Texte recherché (normalisé)
+
+        Returns:
+            list: Positions des candidats, du plus proche au moins proche
+        """
+        if self.mode == 'bktree':
+            matches = self.bktree.search(name_text, self.max_distance)
+            return [position for _, position in matches[:self.candidate_limit]]
+        if self.mode == 'phonetic':
+            return self.phonetic_index.candidates(name_text, self.candidate_limit)
+
+        # Patients partageant le plus de trigrammes avec le texte
+        return self.ngram_index.candidates(name_text, self.candidate_limit)
+
+    def exact_hit_rate(self):
+        """Proportion des recherches résolues par correspondance exacte"""
+        if not self.stats['lookups']:
+            return 0.0
+        return self.stats['exact_hits'] / self.stats['lookups']
+
+
+# Nombre de trigrammes (les plus rares) envoyés à SQLite par requête FTS5
+FTS_QUERY_GRAMS = 8
+
+# Fichier d'index persistant: en-tête JSON puis sections binaires alignées
+INDEX_MAGIC = b'MDSIDX01'
+INDEX_VERSION = 4
+
+
+class SortedKeyIndex:
+    """
+    Correspondances exactes clé -> position(s) lues depuis un index sur disque
+
+    Les clés sont triées dans un tampon: une recherche dichotomique remplace
+    le dict construit en mémoire, sans rien recharger au démarrage. `get`
+    a la même sémantique que le dict de PatientMatcher.exact.
+    """
+
+    def __init__(self, keys, key_offsets, positions):
+        self.keys = keys
+        self.key_offsets = key_offsets
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def key(self, i):
+        return str(self.keys[self.key_offsets[i]:self.key_offsets[i + 1]], 'utf-8')
+
+    def get(self, key, default=None):
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self.key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        positions = []
+        while low < len(self) and self.key(low) == key:
+            positions.append(self.positions[low])
+            low += 1
+        if not positions:
+            return default
+        return positions if len(positions) > 1 else positions[0]
+
+    def items(self):
+        """Couples (clé, position), une entrée par homonyme"""
+        for i in range(len(self)):
+            yield self.key(i), self.positions[i]
+
+
+class MappedPostings:
+    """
+    Listes de positions par clé lues depuis un index sur disque
+
+    Les clés sont triées dans un tampon (SortedKeyIndex vers le numéro de
+    leur liste): rien n'est reconstruit au démarrage, même pour des
+    dizaines de milliers de clés. `get` a la même sémantique qu'un dict.
+    """
+
+    def __init__(self, keys, offsets, flat):
+        self.keys = keys
+        self.offsets = offsets
+        self.flat = flat
+
+    def get(self, key, default=None):
+        number = self.keys.get(key)
+        if number is None:
+            return default
+        return self[number]
+
+    def __getitem__(self, number):
+        return self.flat[self.offsets[number]:self.offsets[number + 1]]
+
+    def items(self):
+        """Couples (clé, positions)"""
+        for key, number in self.keys.items():
+            yield key, self[number]
+
+
+class LayeredKeyIndex:
+    """
+    Correspondances exactes d'un index sur disque complétées en mémoire
+
+    Utilisé quand des patients sont ajoutés à un index projeté en mémoire
+    (rafraîchissement à chaud): les nouvelles clés vont dans un petit dict
+    `added`, l'index d'origine n'est pas reconstruit.
+    """
+
+    def __init__(self, base, added):
+        self.base = base
+        self.added = added
+
+    def get(self, key, default=None):
+        base = self.base.get(key)
+        added = self.added.get(key)
+        if added is None:
+            return default if base is None else base
+        if base is None:
+            return added
+        base = base if isinstance(base, list) else [base]
+        return base + (added if isinstance(added, list) else [added])
+
+    def items(self):
+        yield from self.base.items()
+        yield from self.added.items()
+
+
+def _postings_arrays(postings):
+    """
+    Listes de positions par clé mises bout à bout
+
+    Returns:
+        tuple: (clés triées, début de la liste de chaque clé, positions)
+    """
+    items = sorted(postings.items(), key=lambda item: item[0])
+    offsets = array('I', [0])
+    flat = array('I')
+    for _, positions in items:
+        flat.extend(positions)
+        offsets.append(len(flat))
+    return [key for key, _ in items], offsets, flat
+
+
+def _postings_dict(keys, offsets, flat):
+    """Inverse de _postings_arrays (listes partagées avec `flat`)"""
+    return {key: flat[offsets[i]:offsets[i + 1]] for i, key in enumerate(keys)}
+
+
+def _sorted_key_arrays(items):
+    """
+    Couples (clé, position ou liste de positions) au format de SortedKeyIndex
+
+    Returns:
+        tuple: (tampon des clés triées, décalages des clés, positions)
+    """
+    entries = []
+    for key, positions in items:
+        for position in (positions if isinstance(positions, list) else [positions]):
+            entries.append((key, position))
+    entries.sort()
+    keys = bytearray()
+    key_offsets = array('I', [0])
+    positions = array('I')
+    for key, position in entries:
+        keys += key.encode('utf-8')
+        key_offsets.append(len(keys))
+        positions.append(position)
+    return keys, key_offsets, positions
+
+
+def save_index(matcher, path, signature):
+    """
+    Sérialiser le stockage et les index communs d'un PatientMatcher
+
+    Le fichier peut ensuite être projeté en mémoire par load_index, ce qui
+    évite de relire la base et de reconstruire les index au redémarrage.
+
+    Args:
+        matcher: PatientMatcher construit en mémoire
+        path: Chemin du fichier d'index
+        signature: Empreinte de la source (base SQLite ou fichier texte)
+    """
+    store = matcher.patients
+    grams, gram_offsets, postings = _postings_arrays(matcher.ngram_index.postings)
+    exact_keys, exact_key_offsets, exact_positions = _sorted_key_arrays(matcher.exact.items())
+
+    sections = [
+        ('fields', 'B', store.fields),
+        ('field_offsets', 'I', store.field_offsets),
+        ('keys', 'B', store.keys),
+        ('key_offsets', 'I', store.key_offsets),
+        ('dobs', 'I', store.dobs),
+        ('int_ids', 'B', store.int_ids),
+        ('gram_offsets', 'I', gram_offsets),
+        ('postings', 'I', postings),
+        ('exact_keys', 'B', exact_keys),
+        ('exact_key_offsets', 'I', exact_key_offsets),
+        ('exact_positions', 'I', exact_positions),
+    ]
+
+    # Index propre au mode, sauvegardé lui aussi: seuls les patients ajoutés
+    # depuis sa construction (couche LayeredIndex) sont réindexés au démarrage
+    optional = None
+    if matcher.mode in OPTIONAL_INDEXES:
+        index = getattr(matcher, OPTIONAL_INDEXES[matcher.mode][0])
+        size = len(store)
+        if isinstance(index, LayeredIndex):
+            index, size = index.base, index.size
+        keys, arrays = index.arrays()
+        optional = {'mode': matcher.mode, 'size': size, 'keys': keys}
+        sections.extend((name, 'B' if isinstance(data, (bytes, bytearray)) else 'I', data)
+                        for name, data in arrays.items())
+    header = {
+        'version': INDEX_VERSION,
+        'signature': signature,
+        'byteorder': sys.byteorder,
+        'count': len(store),
+        'n': matcher.ngram_index.n,
+        'grams': grams,
+        'optional': optional,
+        'sections': {},
+    }
+    blobs = []
+    offset = 0
+    for name, typecode, data in sections:
+        blob = memoryview(data).tobytes()
+        header['sections'][name] = [offset, len(blob), typecode]
+        padding = -len(blob) % 8
+        blobs.append(blob + b'\0' * padding)
+        offset += len(blob) + padding
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    prefix = INDEX_MAGIC + len(header_bytes).to_bytes(4, 'little') + header_bytes
+    prefix += b'\0' * (-len(prefix) % 8)
+
+    # Écriture atomique: un redémarrage ne voit jamais un fichier partiel
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(prefix)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(temp_path, path)
+
+
+def load_index(path, signature, mode='ngram', **options):
+    """
+    Projeter en mémoire un index sauvegardé par save_index
+
+    Args:
+        path: Chemin du fichier d'index
+        signature: Empreinte attendue de la source
+        mode: Mode de recherche
+        options: Paramètres supplémentaires de PatientMatcher
+
+    Returns:
+        PatientMatcher: Index prêt à l'emploi, ou None si le fichier est
+                        absent, illisible, ne correspond plus à la source ou
+                        a été sauvegardé pour un autre mode de recherche
+    """
+    if not os.path.exists(path):
+        return None
+
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Fichier vide
+            return None
+
+    if mapped[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+        return None
+    header_start = len(INDEX_MAGIC) + 4
+    header_length = int.from_bytes(mapped[len(INDEX_MAGIC):header_start], 'little')
+    try:
+        header = json.loads(mapped[header_start:header_start + header_length])
+    except ValueError:
+        return None
+    if (header.get('version') != INDEX_VERSION or header.get('signature') != signature
+            or header.get('byteorder') != sys.byteorder):
+        return None
+    optional = header.get('optional')
+    if mode in OPTIONAL_INDEXES and (optional is None or optional['mode'] != mode):
+        # Index du mode absent: reconstruction complète, puis sauvegarde
+        return None
+
+    data_start = header_start + header_length
+    data_start += -data_start % 8
+    view = memoryview(mapped)
+
+    def section(name):
+        offset, length, typecode = header['sections'][name]
+        data = view[data_start + offset:data_start + offset + length]
+        return data if typecode == 'B' else data.cast(typecode)
+
+    store = PatientStore.from_buffers(section('fields'), section('field_offsets'),
+                                      section('keys'), section('key_offsets'),
+                                      section('dobs'), section('int_ids'))
+    ngram_index = NgramIndex.from_arrays(header['grams'], section('gram_offsets'),
+                                         section('postings'), header['n'])
+    exact = SortedKeyIndex(section('exact_keys'), section('exact_key_offsets'),
+                           section('exact_positions'))
+    index, size = None, 0
+    if mode in OPTIONAL_INDEXES:
+        index = OPTIONAL_INDEXES[mode][1].from_arrays(optional['keys'], section, store.key_view())
+        size = optional['size']
+    return PatientMatcher.from_index(store, ngram_index, exact, mode, **options,
+                                     optional=index, optional_size=size)
+
+
+class FtsPatientIndex:
+    """
+    Index patients dans une base SQLite locale (FTS5, tokenizer trigram)
+
+    Les patients ne sont pas chargés en Python: SQLite renvoie les meilleurs
+    candidats pour chaque nom extrait et seuls ceux-ci sont scorés. La
+    mémoire reste constante quelle que soit la taille de la base, et le
+    fichier peut être partagé par plusieurs processus de classement (WAL).
+    Même interface de recherche que PatientMatcher (mode trigrammes).
+    """
+
+    # Incrémenté à chaque changement de schéma: l'ancien index est recréé
+    SCHEMA_VERSION = 2
+    SCHEMA = (
+        "PRAGMA journal_mode=WAL",
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+        "CREATE TABLE IF NOT EXISTS patients ("
+        " position INTEGER PRIMARY KEY, id UNIQUE, nom, prenom, name TEXT, name_rev TEXT,"
+        " dob INTEGER)",
+        "CREATE INDEX IF NOT EXISTS patients_name ON patients (name)",
+        "CREATE INDEX IF NOT EXISTS patients_name_rev ON patients (name_rev)",
+        "CREATE INDEX IF NOT EXISTS patients_dob ON patients (dob) WHERE dob > 0",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS patient_names USING fts5("
+        " name, content='patients', content_rowid='position', tokenize='trigram')",
+        # Index FTS tenu à jour à chaque ajout (patients ignorés comme doublons exclus)
+        "CREATE TRIGGER IF NOT EXISTS patients_fts AFTER INSERT ON patients BEGIN"
+        " INSERT INTO patient_names (rowid, name) VALUES (new.position, new.name); END",
+    )
+
+    def __init__(self, path, candidate_limit=NGRAM_CANDIDATES):
+        self.path = path
+        self.candidate_limit = candidate_limit
+        self.mode = 'ngram'
+        self.stats = {'lookups': 0, 'exact_hits': 0, 'dob_hits': 0}
+        # Une connexion par fil: le rafraîchissement écrit pendant les recherches
+        self._local = threading.local()
+        self._connection()
+        self.patients = _FtsPatients(self)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None, check_same_thread=False
+            )
+            if conn.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+                for table in ("patient_names", "patients", "meta"):
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+                conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            # Fréquence des trigrammes, pour n'interroger que les plus rares
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.patient_grams "
+                         "USING fts5vocab(main, patient_names, row)")
+        return conn
+
+    @property
+    def signature(self):
+        """Empreinte de la source indexée (None si l'index n'a jamais été construit)"""
+        row = self._connection().execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+        return row[0] if row else None
+
+    def set_signature(self, signature):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('signature', ?)", (signature,)
+        )
+
+    def _insert(self, conn, patients):
+        """Insérer des patients au fil de l'eau (itérable de tuples, curseur SQL)"""
+        rows = ((patient[0], patient[1], patient[2],
+                 patient_key(patient[1], patient[2]),
+                 patient_key(patient[2], patient[1]),
+                 parse_dob(patient[3]) if len(patient) > 3 else 0) for patient in patients)
+        conn.executemany(
+            "INSERT OR IGNORE INTO patients (id, nom, prenom, name, name_rev, dob) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            rows
+        )
+
+    def rebuild(self, patients, signature=None):
+        """
+        Remplacer tout le contenu de l'index en une transaction
+
+        Les autres processus continuent à lire l'ancien contenu jusqu'à la
+        validation.
+
+        Args:
+            patients: Tuples (id, nom, prenom), éventuellement un curseur SQL
+            signature: Empreinte de la source
+
+        Returns:
+            FtsPatientIndex: L'index lui-même
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT INTO patient_names (patient_names) VALUES ('delete-all')")
+            conn.execute("DELETE FROM patients")
+            self._insert(conn, patients)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('signature', ?)",
+                         (signature,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self
+
+    def extended(self, patients):
+        """
+        Ajouter des patients (rafraîchissement à chaud)
+
+        Les identifiants déjà présents sont ignorés: un autre processus
+        partageant le fichier a pu intégrer les mêmes ajouts.
+
+        Returns:
+            FtsPatientIndex: L'index lui-même
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._insert(conn, patients)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self
+
+    def find(self, name_text):
+        """
+        Trouver le patient correspondant au texte extrait
+
+        Returns:
+            tuple: (patient_id, nom, prenom, score_confiance) ou None
+        """
+        candidates = self.find_candidates(name_text, k=1)
+        if not candidates:
+            return None
+        patient, confidence = candidates[0]
+        return (patient[0], patient[1], patient[2], confidence)
+
+    def find_candidates(self, name_text, k=3, dob=None, with_dob=False):
+        """
+        Trouver les k meilleurs patients parmi les candidats renvoyés par SQLite
+
+        Returns:
+            list: Couples (patient, score_confiance), ou triplets avec with_dob
+                  (voir PatientMatcher.find_candidates), du meilleur au moins bon
+        """
+        name_text = normalize_name(name_text)
+        self.stats['lookups'] += 1
+        candidates = self._search(name_text, k)
+
+        # Date de naissance connue: départage des candidats de même score
+        dob = parse_dob(dob)
+        if dob:
+            rows = self._connection().execute(
+                "SELECT position, id, nom, prenom, name FROM patients WHERE dob = ?", (dob,)
+            ).fetchall()
+            candidates = prefer_dob(candidates, self._score(name_text, rows, k), k)
+            if candidates and candidates[0][2]:
+                self.stats['dob_hits'] += 1
+        else:
+            candidates = [(patient, score, False) for patient, score in candidates]
+        if with_dob:
+            return candidates
+        return [(patient, score) for patient, score, _ in candidates]
+
+    def _search(self, name_text, k):
+        """Recherche habituelle: index B-tree des clés exactes, sinon FTS5"""
+        conn = self._connection()
+
+        # Chemin rapide: nom imprimé proprement (index B-tree sur les clés)
+        rows = conn.execute(
+            "SELECT id, nom, prenom FROM patients WHERE name = ? OR name_rev = ? "
+            "ORDER BY position LIMIT ?", (name_text, name_text, k)
+        ).fetchall()
+        if rows:
+            self.stats['exact_hits'] += 1
+            return [(row, 1.0) for row in rows]
+
+        # Trigrammes les plus rares de la requête (le tokenizer les met en
+        # minuscules), combinés en OU et classés par SQLite (bm25)
+        grams = sorted({name_text[i:i + 3].lower() for i in range(len(name_text) - 2)})
+        if not grams:
+            return []
+        frequencies = dict(conn.execute(
+            f"SELECT term, doc FROM temp.patient_grams WHERE term IN ({','.join('?' * len(grams))})",
+            grams
+        ).fetchall())
+        grams = sorted((gram for gram in grams if gram in frequencies), key=frequencies.get)
+        if not grams:
+            return []
+        query = ' OR '.join('"' + gram.replace('"', '""') + '"' for gram in grams[:FTS_QUERY_GRAMS])
+        rows = conn.execute(
+            "SELECT p.position, p.id, p.nom, p.prenom, p.name FROM patient_names "
+            "JOIN patients p ON p.position = patient_names.rowid "
+            "WHERE patient_names MATCH ? ORDER BY rank LIMIT ?",
+            (query, self.candidate_limit)
+        ).fetchall()
+        return self._score(name_text, rows, k)
+
+    def _score(self, name_text, rows, k):
+        """Scorer des lignes (position, id, nom, prenom, clé) et garder les k meilleures"""
+        patients = {row[0]: (row[1], row[2], row[3]) for row in rows}
+        scored = best_matches(name_text, ((row[0], row[4]) for row in rows), k)
+        return [(patients[position], score) for score, position in scored]
+
+    def find_by_id(self, patient_id, name_text):
+        """Patient d'identifiant donné parmi ceux portant exactement ce nom"""
+        name_text = normalize_name(name_text)
+        return self._connection().execute(
+            "SELECT id, nom, prenom FROM patients WHERE name = ? AND CAST(id AS TEXT) = ?",
+            (name_text, str(patient_id))
+        ).fetchone()
+
+    def find_batch(self, names, k=1):
+        """Recherche de plusieurs textes (une requête SQLite par texte)"""
+        return [self.find_candidates(name, k) for name in names]
+
+    def exact_hit_rate(self):
+        """Proportion des recherches résolues par correspondance exacte"""
+        if not self.stats['lookups']:
+            return 0.0
+        return self.stats['exact_hits'] / self.stats['lookups']
+
+
+class _FtsPatients(Sequence):
+    """Vue en lecture seule sur les patients d'un FtsPatientIndex"""
+
+    __slots__ = ('index',)
+
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return self.index._connection().execute("SELECT COUNT(*) FROM patients").fetchone()[0]
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        row = self.index._connection().execute(
+            "SELECT id, nom, prenom FROM patients ORDER BY position LIMIT 1 OFFSET ?", (position,)
+        ).fetchone()
+        if position < 0 or row is None:
+            raise IndexError(position)
+        return row
+
+    def __iter__(self):
+        yield from self.index._connection().execute(
+            "SELECT id, nom, prenom FROM patients ORDER BY position"
+        )
+
+
+class AliasStore:
+    """
+    Alias appris: texte extrait (normalisé) -> patient, dans une base SQLite
+
+    Quand un document non reconnu est classé à la main, la lecture OCR
+    fautive est enregistrée comme alias du patient: les documents suivants
+    portant le même en-tête sont résolus par une simple consultation de
+    dict. Les documents en attente de classement manuel sont aussi notés,
+    avec le texte extrait, pour que l'outil resolve_alias.py les retrouve.
+    """
+
+    SCHEMA = (
+        "PRAGMA journal_mode=WAL",
+        "CREATE TABLE IF NOT EXISTS aliases ("
+        " alias TEXT PRIMARY KEY, patient_id, nom TEXT, prenom TEXT, created TEXT)",
+        "CREATE TABLE IF NOT EXISTS pending ("
+        " document TEXT PRIMARY KEY, extracted_name TEXT, reason TEXT, created TEXT)",
+    )
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                    check_same_thread=False)
+        self.lock = threading.Lock()
+        for statement in self.SCHEMA:
+            self.conn.execute(statement)
+        self.stats = {'lookups': 0, 'hits': 0}
+        self._aliases = {}
+        self._data_version = None
+        self._reload()
+
+    def _reload(self, force=False):
+        """
+        Recharger les alias si la base a été modifiée (outil en ligne de commande)
+
+        Args:
+            force: Recharger même si data_version n'a pas changé (il ne
+                   reflète que les écritures des autres connexions)
+        """
+        data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if force or data_version != self._data_version:
+            self._aliases = {alias: (patient_id, nom, prenom) for alias, patient_id, nom, prenom
+                             in self.conn.execute("SELECT alias, patient_id, nom, prenom FROM aliases")}
+            self._data_version = data_version
+
+    def get(self, name_text):
+        """
+        Patient associé au texte extrait
+
+        Args:
+            name_text: Texte brut extrait du document
+
+        Returns:
+            tuple: (patient_id, nom, prenom) ou None
+        """
+        with self.lock:
+            self._reload()
+            self.stats['lookups'] += 1
+            patient = self._aliases.get(normalize_name(name_text))
+            if patient is not None:
+                self.stats['hits'] += 1
+            return patient
+
+    def add(self, name_text, patient):
+        """
+        Enregistrer une résolution manuelle
+
+        Args:
+            name_text: Texte extrait du document (lecture OCR fautive)
+            patient: Tuple (patient_id, nom, prenom) choisi par la secrétaire
+        """
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO aliases (alias, patient_id, nom, prenom, created) "
+                "VALUES (?, ?, ?, ?, datetime('now'))",
+                (normalize_name(name_text), patient[0], patient[1], patient[2])
+            )
+            self._reload(force=True)
+
+    def remove(self, name_text):
+        """Supprimer un alias (résolution erronée)"""
+        with self.lock:
+            deleted = self.conn.execute("DELETE FROM aliases WHERE alias = ?",
+                                        (normalize_name(name_text),)).rowcount
+            self._reload(force=True)
+            return deleted > 0
+
+    def items(self):
+        """Couples (alias, (patient_id, nom, prenom)), par ordre alphabétique"""
+        with self.lock:
+            self._reload()
+            return sorted(self._aliases.items())
+
+    def record_pending(self, document, extracted_name, reason):
+        """Noter un document envoyé en classement manuel, avec le texte extrait"""
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pending (document, extracted_name, reason, created) "
+                "VALUES (?, ?, ?, datetime('now'))",
+                (document, extracted_name, reason)
+            )
+
+    def pending(self):
+        """Documents en attente: liste de (document, texte extrait, raison, date)"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT document, extracted_name, reason, created FROM pending ORDER BY created"
+            ).fetchall()
+
+    def resolve(self, document, patient):
+        """
+        Classer un document en attente: son texte extrait devient un alias
+
+        Returns:
+            str: Texte extrait enregistré comme alias, ou None si le document
+                 est inconnu
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT extracted_name FROM pending WHERE document = ?",
+                                    (document,)).fetchone()
+        if row is None:
+            return None
+        self.add(row[0], patient)
+        with self.lock:
+            self.conn.execute("DELETE FROM pending WHERE document = ?", (document,))
+        return row[0]
+
+    def hit_rate(self):
+        """Proportion des recherches résolues par un alias"""
+        return self.stats['hits'] / self.stats['lookups'] if self.stats['lookups'] else 0.0
+
+    def close(self):
+        self.conn.close()
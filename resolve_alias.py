@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Enregistrer le classement manuel d'un document non reconnu
+
+Le texte extrait du document (lecture OCR fautive) devient un alias du
+patient choisi: les prochains documents portant le même en-tête seront
+classés automatiquement.
+
+Exemples:
+    python3 resolve_alias.py --pending
+    python3 resolve_alias.py low_confidence_scan_001.pdf 42
+    python3 resolve_alias.py --name "DUPOMT JEAN" 42
+    python3 resolve_alias.py --list
+    python3 resolve_alias.py --delete "DUPOMT JEAN"
+"""
+
+import sys
+import argparse
+
+from medistory_auto_classifier import ALIAS_DB_FILE, PatientDatabase
+from patient_index import AliasStore
+
+
+def find_patient_by_id(patient_db, patient_id):
+    """Patient (id, nom, prenom) d'identifiant donné, ou None"""
+    for patient in patient_db.patients_cache:
+        if str(patient[0]) == str(patient_id):
+            return patient
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Apprendre la correspondance entre un texte OCR et un patient"
+    )
+    parser.add_argument("document", nargs="?",
+                        help="Fichier du dossier NON_TRAITES classé à la main")
+    parser.add_argument("patient_id", nargs="?", help="Identifiant du patient dans Médistory")
+    parser.add_argument("--name", help="Texte extrait à associer (au lieu d'un document)")
+    parser.add_argument("--pending", action="store_true", help="Lister les documents en attente")
+    parser.add_argument("--list", action="store_true", help="Lister les alias appris")
+    parser.add_argument("--delete", metavar="TEXTE", help="Supprimer un alias")
+    args = parser.parse_args()
+
+    if not ALIAS_DB_FILE:
+        print("✗ Alias désactivés (ALIAS_DB_FILE = None)")
+        return 1
+    aliases = AliasStore(ALIAS_DB_FILE)
+
+    if args.pending:
+        for document, extracted_name, reason, created in aliases.pending():
+            print(f"{created}  {document}  ({reason})  texte lu: {extracted_name}")
+        return 0
+
+    if args.list:
+        for alias, (patient_id, nom, prenom) in aliases.items():
+            print(f"{alias} → {patient_id} {nom} {prenom}")
+        return 0
+
+    if args.delete:
+        if aliases.remove(args.delete):
+            print(f"✓ Alias supprimé: {args.delete}")
+            return 0
+        print(f"✗ Alias inconnu: {args.delete}")
+        return 1
+
+    # Avec --name, le seul argument positionnel est l'identifiant du patient
+    if args.name and args.document and not args.patient_id:
+        args.patient_id, args.document = args.document, None
+    if not args.patient_id or not (args.document or args.name):
+        parser.print_help()
+        return 1
+
+    patient = find_patient_by_id(PatientDatabase(), args.patient_id)
+    if patient is None:
+        print(f"✗ Patient {args.patient_id} introuvable dans la base")
+        return 1
+
+    if args.name:
+        aliases.add(args.name, patient)
+        extracted_name = args.name
+    else:
+        extracted_name = aliases.resolve(args.document, patient)
+        if extracted_name is None:
+            print(f"✗ Document inconnu: {args.document} (voir --pending)")
+            return 1
+
+    print(f"✓ « {extracted_name} » → {patient[0]} {patient[1]} {patient[2]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark du chargement d'un export CSV de patients
+Compare l'ancienne lecture (split(',') ligne à ligne puis liste de tuples)
+avec la lecture en continu PatientFile qui alimente directement PatientStore
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+
+# Ajouter le répertoire parent au path pour importer les modules principaux
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import patient_index
+from patient_index import PatientFile, PatientStore
+from benchmark_matching import generate_patients
+
+SIZES = [100_000, 500_000]
+
+
+def write_export(path, patients, encoding='utf-8', delimiter=','):
+    """Écrire un export CSV avec en-tête, comme depuis Médistory ou Excel"""
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        f.write(delimiter.join(("ID", "NOM", "PRENOM")) + "\r\n")
+        for patient_id, nom, prenom in patients:
+            f.write(f"{patient_id}{delimiter}{nom}{delimiter}{prenom}\r\n")
+
+
+def load_split(path):
+    """Chargement d'origine: split manuel puis PatientStore"""
+    patients = []
+    with open(path, 'r', encoding='utf-8') as f:
+        next(f)
+        for line in f:
+            parts = line.strip().split(',')
+            if len(parts) >= 3:
+                patients.append(tuple(parts))
+    return PatientStore(patients)
+
+
+def main():
+    rng = random.Random(42)
+
+    print("=" * 72)
+    print("BENCHMARK CHARGEMENT CSV PATIENTS")
+    print("=" * 72)
+    print(f"{'Patients':>10} | {'Lecture':>28} | {'Durée':>8} | {'Lignes/s':>10}")
+    print("-" * 72)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in SIZES:
+            patients = generate_patients(size, rng)
+            exports = (
+                ("split(',')", os.path.join(tmpdir, "split.csv"), 'utf-8', ','),
+                ("PatientFile utf-8 ,", os.path.join(tmpdir, "utf8.csv"), 'utf-8', ','),
+                ("PatientFile BOM ;", os.path.join(tmpdir, "bom.csv"), 'utf-8-sig', ';'),
+                ("PatientFile cp1252 ;", os.path.join(tmpdir, "excel.csv"), 'cp1252', ';'),
+            )
+            for label, path, encoding, delimiter in exports:
+                write_export(path, patients, encoding, delimiter)
+                # Même point de départ pour chaque lecture (cache de normalisation vide)
+                patient_index._normalize_field.cache_clear()
+                start = time.perf_counter()
+                if label.startswith("split"):
+                    store = load_split(path)
+                else:
+                    store = PatientStore(PatientFile(path))
+                elapsed = time.perf_counter() - start
+                assert len(store) == size, (label, len(store))
+                print(f"{size:>10} | {label:>28} | {elapsed:>6.2f} s | {size / elapsed:>10.0f}")
+            print("-" * 72)
+
+
+if __name__ == "__main__":
+    main()
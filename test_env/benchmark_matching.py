@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la recherche de patients
+Compare la recherche linéaire d'origine (get_close_matches sur toute la base)
+avec les générateurs de candidats de patient_index (trigrammes, BK-tree...)
+et la recherche par lots NumPy, sur des bases synthétiques
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+from difflib import get_close_matches, SequenceMatcher
+
+# Ajouter le répertoire parent au path pour importer les modules principaux
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from patient_index import PatientMatcher, FtsPatientIndex, MATCHING_MODES
+
+SIZES = [1_000, 10_000, 100_000]
+QUERIES = 20
+
+SYLLABES = ["BER", "NAR", "DU", "PON", "MAR", "TIN", "LE", "FEV", "RE", "GAU",
+            "THIER", "ROB", "ERT", "PE", "TIT", "MO", "REAU", "SI", "MON", "LAU",
+            "RENT", "MI", "CHEL", "GAR", "CIA", "DA", "VID", "ROUX", "VIN", "CENT"]
+PRENOMS = ["Jean", "Marie", "Pierre", "Sophie", "Luc", "Anne", "François",
+           "Isabelle", "Michel", "Catherine", "Philippe", "Nathalie", "Alain",
+           "Sylvie", "Olivier", "Martine", "Christophe", "Véronique", "Patrick"]
+
+
+def generate_patients(count, rng):
+    """Générer une base synthétique de patients (id, nom, prenom)"""
+    patients = []
+    for i in range(1, count + 1):
+        nom = "".join(rng.choice(SYLLABES) for _ in range(rng.randint(2, 4)))
+        patients.append((str(i), nom, rng.choice(PRENOMS)))
+    return patients
+
+
+def ocr_typo(text, rng):
+    """Simuler une erreur OCR (substitution ou suppression d'un caractère)"""
+    position = rng.randrange(len(text))
+    if rng.random() < 0.5:
+        return text[:position] + text[position + 1:]
+    return text[:position] + rng.choice("ABCDEFGHIJKLMNOPRSTUV") + text[position + 1:]
+
+
+def find_patient_lineaire(patients, name_text):
+    """Algorithme d'origine: get_close_matches sur tous les patients"""
+    name_text = name_text.upper().strip()
+    patient_names = [f"{p[1]} {p[2]}".upper() for p in patients]
+    matches = get_close_matches(name_text, patient_names, n=3, cutoff=0.6)
+    if matches:
+        best_match = matches[0]
+        for patient in patients:
+            if f"{patient[1]} {patient[2]}".upper() == best_match:
+                confidence = SequenceMatcher(None, name_text, best_match).ratio()
+                return (patient[0], patient[1], patient[2], confidence)
+    return None
+
+
+def measure(find, queries):
+    """Mesurer la latence moyenne (ms) et le nombre de bons résultats"""
+    found = 0
+    start = time.perf_counter()
+    for query, expected_id in queries:
+        result = find(query)
+        if result and result[0] == expected_id:
+            found += 1
+    elapsed = time.perf_counter() - start
+    return elapsed / len(queries) * 1000, found
+
+
+def main():
+    rng = random.Random(42)
+
+    print("=" * 72)
+    print("BENCHMARK RECHERCHE PATIENTS")
+    print("=" * 72)
+    print(f"{'Patients':>10} | {'Méthode':>10} | {'Construction':>12} | {'Latence':>12} | {'Trouvés':>8}")
+    print("-" * 72)
+
+    for size in SIZES:
+        patients = generate_patients(size, rng)
+        targets = rng.sample(patients, QUERIES)
+        queries = []
+        for patient in targets:
+            name = f"{patient[1]} {patient[2]}"
+            queries.append((ocr_typo(name, rng) if rng.random() < 0.5 else name, patient[0]))
+
+        linear_ms, linear_found = measure(lambda q: find_patient_lineaire(patients, q), queries)
+        print(f"{size:>10} | {'linéaire':>10} | {'':>12} | {linear_ms:>9.2f} ms | {linear_found:>3}/{QUERIES}")
+
+        for mode in MATCHING_MODES:
+            start = time.perf_counter()
+            matcher = PatientMatcher(patients, mode=mode)
+            build_time = time.perf_counter() - start
+
+            indexed_ms, indexed_found = measure(matcher.find, queries)
+            print(f"{'':>10} | {mode:>10} | {build_time:>10.2f} s | {indexed_ms:>9.2f} ms | "
+                  f"{indexed_found:>3}/{QUERIES}")
+
+        # Recherche par lots: toutes les requêtes en un appel
+        matcher = PatientMatcher(patients)
+        matcher.find_batch(["PREPARATION"])
+        start = time.perf_counter()
+        results = matcher.find_batch([query for query, _ in queries])
+        batch_ms = (time.perf_counter() - start) / len(queries) * 1000
+        batch_found = sum(1 for result, (_, expected_id) in zip(results, queries)
+                          if result and result[0][0][0] == expected_id)
+        print(f"{'':>10} | {'lots':>10} | {'':>12} | {batch_ms:>9.2f} ms | {batch_found:>3}/{QUERIES}")
+
+        # Index SQLite FTS5: candidats sélectionnés par SQLite, rien en mémoire
+        with tempfile.TemporaryDirectory() as tmpdir:
+            start = time.perf_counter()
+            fts_index = FtsPatientIndex(os.path.join(tmpdir, "patients_fts.db"))
+            fts_index.rebuild(patients)
+            build_time = time.perf_counter() - start
+            fts_ms, fts_found = measure(fts_index.find, queries)
+            print(f"{'':>10} | {'fts5':>10} | {build_time:>10.2f} s | {fts_ms:>9.2f} ms | "
+                  f"{fts_found:>3}/{QUERIES}")
+        print("-" * 72)
+
+
+if __name__ == "__main__":
+    main()
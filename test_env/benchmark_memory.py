@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark mémoire de la base patients
+Compare une liste de tuples (résultat de cursor.fetchall()) avec le stockage
+compact PatientStore, mesure l'index de recherche complet, puis le
+redémarrage à chaud depuis l'index persistant (save_index/load_index)
+"""
+
+import os
+import sys
+import gc
+import time
+import random
+import tempfile
+import tracemalloc
+
+# Ajouter le répertoire parent au path pour importer les modules principaux
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from patient_index import PatientStore, PatientMatcher, save_index, load_index
+from benchmark_matching import generate_patients
+
+SIZES = [100_000, 1_000_000]
+
+
+def measure(build):
+    """Mémoire allouée (Mo) et durée (s) de construction d'un objet"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current / 1024 / 1024, elapsed
+
+
+def fetch_rows(size, seed):
+    """Lignes (id, nom, prenom) avec des chaînes distinctes, comme fetchall()"""
+    rng = random.Random(seed)
+    return [(int(p[0]), p[1], (p[2] + ' ')[:-1]) for p in generate_patients(size, rng)]
+
+
+def main():
+    print("=" * 72)
+    print("BENCHMARK MÉMOIRE BASE PATIENTS")
+    print("=" * 72)
+    print(f"{'Patients':>10} | {'Structure':>22} | {'Mémoire':>10} | {'Par patient':>11} | {'Durée':>8}")
+    print("-" * 72)
+
+    for size in SIZES:
+        rows, tuples_mb, tuples_s = measure(lambda: fetch_rows(size, 42))
+        store, store_mb, store_s = measure(lambda: PatientStore(rows))
+        del rows
+        matcher, matcher_mb, matcher_s = measure(lambda: PatientMatcher(store))
+
+        for label, mb, seconds in (("liste de tuples", tuples_mb, tuples_s),
+                                   ("PatientStore", store_mb, store_s),
+                                   ("index trigrammes", matcher_mb, matcher_s)):
+            print(f"{size:>10} | {label:>22} | {mb:>7.1f} Mo | "
+                  f"{mb * 1024 * 1024 / size:>7.0f} o   | {seconds:>6.2f} s")
+
+        # Redémarrage à chaud: projection mémoire de l'index sauvegardé
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "patients.idx")
+            save_index(matcher, path, "benchmark")
+            start = time.perf_counter()
+            loaded = load_index(path, "benchmark")
+            load_s = time.perf_counter() - start
+            start = time.perf_counter()
+            loaded.find("DUPONT Jean")
+            first_ms = (time.perf_counter() - start) * 1000
+            print(f"{size:>10} | {'index persistant':>22} | "
+                  f"{os.path.getsize(path) / 1024 / 1024:>7.1f} Mo | {'(disque)':>11} | "
+                  f"{load_s:>6.3f} s")
+            print(f"{'':>10} | {'1re recherche':>22} | {'':>10} | {'':>11} | {first_ms:>5.1f} ms")
+            del loaded
+        print("-" * 72)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de l'OCR progressif (bande d'en-tête puis page entière), de la
+cascade de résolutions (OCR_DPI_TIERS), des moteurs OCR (pytesseract,
+tesserocr) et de l'OCR mot à mot avec arrêt anticipé (OCR_WORD_LEVEL)
+Les documents de test (documents_test/*.txt) sont rendus en pages A4 à
+300 DPI, puis lus par OCR page entière, par OCR progressif et par palier
+de résolution
+
+Sans Tesseract installé, seule la position du nom dans la page est mesurée
+(part des documents dont le nom tombe dans la bande d'en-tête)
+"""
+
+import os
+import sys
+import glob
+import time
+import shutil
+import statistics
+
+# Ajouter le répertoire parent au path pour importer les modules principaux
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageFont
+
+import medistory_auto_classifier as classifier
+from medistory_auto_classifier import DocumentProcessor, create_ocr_engine
+
+DOCUMENTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "documents_test")
+
+# Page A4 à 300 DPI, texte en corps 10 (42 px), marges de 2 cm
+DPI = 300
+PAGE_SIZE = (2480, 3508)
+FONT_SIZE = 42
+LINE_HEIGHT = 60
+MARGIN = 236
+
+
+def render_page(text):
+    """
+    Rendre un document texte en page A4 (niveaux de gris)
+
+    Returns:
+        tuple: (image, liste des ordonnées de chaque ligne)
+    """
+    image = Image.new('L', PAGE_SIZE, 255)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=FONT_SIZE)
+    positions = []
+    y = MARGIN
+    for line in text.splitlines():
+        positions.append(y)
+        draw.text((MARGIN, y), line, fill=0, font=font)
+        y += LINE_HEIGHT
+    return image, positions
+
+
+def name_line_position(processor, text, positions):
+    """Ordonnée relative (0-1) de la ligne portant le nom du patient, ou None"""
+    for line, y in zip(text.splitlines(), positions):
+        if processor.extract_patient_name(line):
+            return y / PAGE_SIZE[1]
+    return None
+
+
+def resample(image, dpi):
+    """Page réduite à une résolution de la cascade"""
+    if dpi >= DPI:
+        return image
+    scale = dpi / DPI
+    return image.resize((round(image.width * scale), round(image.height * scale)), Image.LANCZOS)
+
+
+def timed_ocr(ocr, image, runs=3):
+    """Médiane de durée (ms) et texte d'un OCR"""
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        text = ocr(image)
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations), text
+
+
+def main():
+    processor = DocumentProcessor(patient_db=None)
+    fraction = classifier.OCR_HEADER_FRACTION or 1
+    documents = sorted(glob.glob(os.path.join(DOCUMENTS_DIR, "*.txt")))
+    pages = []
+    for path in documents:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        image, positions = render_page(text)
+        pages.append((os.path.basename(path), image, name_line_position(processor, text, positions)))
+
+    print("=" * 72)
+    print(f"BENCHMARK OCR PROGRESSIF (en-tête = {fraction:.0%} de la page)")
+    print("=" * 72)
+    in_header = sum(1 for _, _, y in pages if y is not None and y < fraction)
+    print(f"Nom dans la bande d'en-tête: {in_header}/{len(pages)} documents")
+
+    if not shutil.which("tesseract"):
+        print("Tesseract absent: mesure OCR ignorée")
+        return
+
+    import pytesseract
+
+    # Sections OCR texte brut (l'OCR mot à mot est mesuré à la fin)
+    word_level = classifier.OCR_WORD_LEVEL
+    classifier.OCR_WORD_LEVEL = False
+
+    def full_page(image):
+        return pytesseract.image_to_string(image, lang='fra')
+
+    def progressive(image):
+        return processor.ocr_image(image)[0]
+
+    print(f"{'Document':>40} | {'Page':>8} | {'Progressif':>10} | {'Zone':>6}")
+    print("-" * 72)
+    totals = {'page': [], 'progressive': []}
+    found = {'page': 0, 'progressive': 0}
+    for name, image, _ in pages:
+        page_ms, page_text = timed_ocr(full_page, image)
+        progressive_ms, progressive_text = timed_ocr(progressive, image)
+        region = processor.ocr_image(image)[1]
+        totals['page'].append(page_ms)
+        totals['progressive'].append(progressive_ms)
+        found['page'] += bool(processor.extract_patient_name(page_text))
+        found['progressive'] += bool(processor.extract_patient_name(progressive_text))
+        print(f"{name[:40]:>40} | {page_ms:>5.0f} ms | {progressive_ms:>7.0f} ms | {region:>6}")
+
+    print("-" * 72)
+    for label in ('page', 'progressive'):
+        print(f"{label:>12}: médiane {statistics.median(totals[label]):>6.0f} ms, "
+              f"total {sum(totals[label]) / 1000:>5.1f} s, noms trouvés {found[label]}/{len(pages)}")
+
+    # Cascade: chaque palier seul (durée, noms trouvés), puis palier retenu
+    print("-" * 72)
+    print(f"Cascade OCR_DPI_TIERS = {classifier.OCR_DPI_TIERS}")
+    resolved = {}
+    for dpi in classifier.OCR_DPI_TIERS:
+        durations, names = [], 0
+        for name, image, _ in pages:
+            duration, text = timed_ocr(progressive, resample(image, dpi), runs=1)
+            durations.append(duration)
+            if processor.extract_patient_name(text):
+                names += 1
+                resolved.setdefault(name, dpi)
+        print(f"{dpi:>8} DPI: médiane {statistics.median(durations):>6.0f} ms, "
+              f"noms trouvés {names}/{len(pages)}")
+    for dpi in classifier.OCR_DPI_TIERS:
+        count = sum(1 for tier in resolved.values() if tier == dpi)
+        print(f"Résolus au palier {dpi} DPI: {count}/{len(pages)}")
+
+    # Moteurs: un processus tesseract par image ou libtesseract résidente
+    print("-" * 72)
+    backends = ['pytesseract'] + (['tesserocr'] if classifier.tesserocr is not None else [])
+    headers = [image.crop((0, 0, image.width, int(image.height * fraction))) for _, image, _ in pages]
+    for backend in backends:
+        start = time.perf_counter()
+        engine = create_ocr_engine(backend)
+        engine.image_to_string(headers[0])
+        first_ms = (time.perf_counter() - start) * 1000
+        durations, names = [], 0
+        for header in headers:
+            duration, text = timed_ocr(engine.image_to_string, header, runs=1)
+            durations.append(duration)
+            names += bool(processor.extract_patient_name(text))
+        engine.close()
+        print(f"{backend:>12}: 1re page {first_ms:>6.0f} ms, puis médiane "
+              f"{statistics.median(durations):>6.0f} ms par en-tête, noms trouvés {names}/{len(pages)}")
+    if classifier.tesserocr is None:
+        print(f"{'tesserocr':>12}: non installé (pip install tesserocr)")
+
+    # OCR mot à mot: mots peu sûrs écartés, arrêt après le nom et la date de naissance
+    print("-" * 72)
+    for label, enabled in (("texte brut", False), ("mot à mot", True)):
+        classifier.OCR_WORD_LEVEL = enabled
+        durations, names, dobs, early = [], 0, 0, 0
+        for _, image, _ in pages:
+            start = time.perf_counter()
+            text, region = processor.ocr_image(image)
+            durations.append((time.perf_counter() - start) * 1000)
+            name, dob = processor.extract_patient_identity(text)
+            names += bool(name)
+            dobs += bool(dob)
+            early += region == 'header'
+        print(f"{label:>12}: médiane {statistics.median(durations):>6.0f} ms, "
+              f"arrêt avant la fin de page {early}/{len(pages)}, noms trouvés {names}/{len(pages)}, "
+              f"dates {dobs}/{len(pages)}")
+    classifier.OCR_WORD_LEVEL = word_level
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark du traitement parallèle d'un lot de scans (pool de processus OCR)
+Les documents de test sont rendus en images A4 à 300 DPI (comme un lot du
+chargeur du scanner), puis traités un par un, puis avec 2, 4... processus OCR,
+sans puis avec processus de rendu en amont (pages en mémoire partagée), et
+enfin en mode arriéré (process_batch: un appel tesseract par lot de pages)
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Ajouter le répertoire parent au path pour importer les modules principaux
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from medistory_auto_classifier import DocumentProcessor
+from patient_index import PatientFile, PatientMatcher
+from benchmark_ocr import DOCUMENTS_DIR, DPI, render_page
+
+BATCH_SIZE = 40
+PATIENTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_patients.txt")
+
+
+class BenchmarkDatabase:
+    """Base patients minimale pour DocumentProcessor (fichier de test)"""
+
+    aliases = None
+
+    def __init__(self):
+        self.matcher = PatientMatcher(PatientFile(PATIENTS_FILE))
+
+    def find_candidates(self, name, k=2, dob=None, with_dob=False):
+        return self.matcher.find_candidates(name, k, dob, with_dob)
+
+
+def worker_counts():
+    """
+    Configurations mesurées: séquentiel, puis puissances de 2 jusqu'au
+    nombre de cœurs, sans et avec processus de rendu
+
+    Returns:
+        list: Couples (processus OCR, processus de rendu)
+    """
+    cores = os.cpu_count() or 1
+    counts, n = [], 1
+    while n < cores:
+        counts.append(n)
+        n *= 2
+    counts.append(cores)
+    configurations = [(0, 0)]
+    for workers in counts:
+        configurations.append((workers, 0))
+        configurations.append((workers, max(1, workers // 4)))
+    return configurations, [0] + counts
+
+
+def main():
+    if not shutil.which("tesseract"):
+        print("Tesseract absent: benchmark ignoré")
+        return
+
+    patient_db = BenchmarkDatabase()
+    documents = sorted(f for f in os.listdir(DOCUMENTS_DIR) if f.endswith('.txt'))
+
+    print("=" * 72)
+    print(f"BENCHMARK TRAITEMENT PARALLÈLE ({BATCH_SIZE} scans, {os.cpu_count()} cœurs)")
+    print("=" * 72)
+    print(f"{'Mode':>8} | {'OCR':>5} | {'Rendu':>5} | {'Durée':>8} | {'Docs/s':>8} | "
+          f"{'Accélération':>12} | {'Identifiés':>10}")
+    print("-" * 72)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        scans = []
+        for i in range(BATCH_SIZE):
+            with open(os.path.join(DOCUMENTS_DIR, documents[i % len(documents)]), encoding='utf-8') as f:
+                image, _ = render_page(f.read())
+            path = os.path.join(tmpdir, f"scan_{i:03d}.png")
+            image.save(path, dpi=(DPI, DPI))
+            scans.append(path)
+
+        baseline = None
+        configurations, batch_workers = worker_counts()
+        runs = [('document', w, r) for w, r in configurations] + [('lots', w, 0) for w in batch_workers]
+        for mode, workers, render_workers in runs:
+            processor = DocumentProcessor(patient_db, workers=workers, render_workers=render_workers)
+            start = time.perf_counter()
+            if mode == 'lots':
+                results = processor.process_batch(scans)
+            else:
+                # Même schéma que ScanWatcher: un fil par processus de rendu et d'OCR
+                with ThreadPoolExecutor(max_workers=max(workers + render_workers, 1)) as executor:
+                    results = list(executor.map(processor.process_document, scans))
+            elapsed = time.perf_counter() - start
+            processor.close()
+            baseline = baseline or elapsed
+            identified = sum(1 for r in results if r['success'])
+            print(f"{mode:>8} | {workers:>5} | {render_workers:>5} | {elapsed:>6.1f} s | "
+                  f"{BATCH_SIZE / elapsed:>8.2f} | {baseline / elapsed:>11.1f}x | {identified:>5}/{BATCH_SIZE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,11 @@ import shutil
 import re
 from pathlib import Path
 from datetime import datetime
-from difflib import get_close_matches, SequenceMatcher
+
+# Ajouter le répertoire parent au path pour importer l'index patients
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from patient_index import PatientMatcher, PatientFile
 
 class PatientDatabase:
     """Base de données des patients"""
@@ -23,36 +27,20 @@ class PatientDatabase:
 
     def load_from_file(self, patient_file):
         """Charger depuis un fichier texte CSV"""
-        if os.path.exists(patient_file):
-            with open(patient_file, 'r', encoding='utf-8') as f:
-                # Ignorer l'en-tête
-                next(f)
-                for line in f:
-                    parts = line.strip().split(',')
-                    if len(parts) >= 3:
-                        self.patients_cache.append(tuple(parts))
-            print(f"  ✓ {len(self.patients_cache)} patients chargés")
+        start = time.perf_counter()
+        reader = PatientFile(patient_file) if os.path.exists(patient_file) else ()
+        # Noms normalisés (accents, apostrophes, tirets) calculés une seule fois,
+        # au fil de la lecture du fichier
+        self.matcher = PatientMatcher(reader)
+        self.patients_cache = self.matcher.patients
+        if reader:
+            elapsed = time.perf_counter() - start
+            print(f"  ✓ {len(self.patients_cache)} patients chargés "
+                  f"({reader.rows / elapsed if elapsed else 0:.0f} lignes/s)")
 
     def find_patient(self, name_text):
         """Trouver le patient correspondant au texte extrait"""
-        name_text = name_text.upper().strip()
-
-        # Créer une liste de noms complets en MAJUSCULES pour la comparaison
-        patient_names = [f"{p[1].upper()} {p[2].upper()}" for p in self.patients_cache]
-
-        # Recherche floue
-        matches = get_close_matches(name_text, patient_names, n=3, cutoff=0.6)
-
-        if matches:
-            best_match = matches[0]
-            # Trouver le patient original
-            for i, patient in enumerate(self.patients_cache):
-                if f"{patient[1].upper()} {patient[2].upper()}" == best_match:
-                    confidence = SequenceMatcher(None, name_text.upper(),
-                                                best_match.upper()).ratio()
-                    return (patient[0], patient[1], patient[2], confidence)
-
-        return None
+        return self.matcher.find(name_text)
 
 
 class SimpleDocumentProcessor:
@@ -116,16 +116,17 @@ def test_patient_matching():
     print("="*60)
     
     try:
-        from difflib import get_close_matches, SequenceMatcher
+        from patient_index import PatientMatcher
         
         # Base de patients de test
         patients = [
-            "DUPONT Jean",
-            "MARTIN Marie",
-            "BERNARD Pierre",
-            "DUBOIS Sophie",
-            "LEFEBVRE Thomas"
+            ("1", "DUPONT", "Jean"),
+            ("2", "MARTIN", "Marie"),
+            ("3", "BERNARD", "Pierre"),
+            ("4", "DUBOIS", "Sophie"),
+            ("5", "LEFEBVRE", "Thomas"),
         ]
+        matcher = PatientMatcher(patients, mode='tokens')
         
         # Tests de reconnaissance
         test_cases = [
@@ -134,22 +135,30 @@ def test_patient_matching():
             ("dupont jean", "DUPONT Jean"),
             ("DUPON Jean", "DUPONT Jean"),  # Typo
             ("Jean DUPONT", "DUPONT Jean"),  # Ordre inversé
+            ("DUPONT Jean Pierre", "DUPONT Jean"),  # Second prénom
         ]
         
         print("\nTests de correspondance:")
         for input_text, expected in test_cases:
-            matches = get_close_matches(input_text.upper(), 
-                                      [p.upper() for p in patients], 
-                                      n=1, cutoff=0.6)
+            match = matcher.find(input_text)
             
-            if matches:
-                best_match = matches[0]
-                confidence = SequenceMatcher(None, input_text.upper(), best_match).ratio()
-                result = "✓" if expected.upper() in best_match else "✗"
+            if match:
+                _, nom, prenom, confidence = match
+                best_match = f"{nom} {prenom}"
+                result = "✓" if best_match == expected else "✗"
                 print(f"{result} '{input_text}' → '{best_match}' (confiance: {confidence:.2f})")
             else:
                 print(f"✗ '{input_text}' → Aucune correspondance")
         
+        # Fichier d'exemple: les lignes de commentaire (#) sont ignorées
+        from patient_index import PatientFile
+        example = Path(__file__).parent / "exemple_liste_patients.txt"
+        rows = list(PatientFile(str(example)))
+        if not rows or any(row[0].startswith('#') for row in rows):
+            print(f"✗ {example.name}: lignes de commentaire lues comme patients")
+            return False
+        print(f"✓ {example.name}: {len(rows)} patients chargés")
+        
         return True
     except Exception as e:
         print(f"✗ Erreur: {e}")
@@ -262,6 +271,291 @@ def test_with_real_document():
         print(f"✗ Erreur: {e}")
         return False
 
+class FakeOcrEngine:
+    """Moteur OCR de test: une ligne de texte par bloc, à l'ordonnée donnée"""
+    
+    name = "test"
+    incremental = False
+    
+    def __init__(self, lines):
+        self.lines = lines  # couples (ordonnée, texte)
+        self.calls = []
+    
+    def image_to_string(self, image):
+        self.calls.append(image.height)
+        return '\n'.join(text for top, text in self.lines if top < image.height)
+    
+    def image_to_blocks(self, image):
+        self.calls.append(image.height)
+        for top, text in self.lines:
+            if top < image.height:
+                yield top, [[(word, 95.0) for word in text.split()]]
+
+def test_header_letterhead():
+    """Test 7: En-tête de cabinet en majuscules au-dessus de la ligne patient"""
+    print("\n" + "="*60)
+    print("TEST 7: En-tête en majuscules (OCR progressif)")
+    print("="*60)
+    
+    from PIL import Image
+    import medistory_auto_classifier as classifier
+    
+    page = Image.new('L', (1000, 3000), 255)
+    lines = [
+        (50, "CABINET DE RADIOLOGIE"),
+        (120, "DOCTEUR FAURE"),
+        (1500, "Patient : DUPONT Jean"),
+    ]
+    word_level = classifier.OCR_WORD_LEVEL
+    try:
+        for classifier.OCR_WORD_LEVEL in (False, True):
+            processor = classifier.DocumentProcessor(None)
+            processor._engine = FakeOcrEngine(lines)
+            text, region = processor.ocr_image(page)
+            name = processor.extract_patient_name(text)
+            print(f"{'✓' if name == 'DUPONT Jean' else '✗'} mot à mot={classifier.OCR_WORD_LEVEL}: "
+                  f"{name!r} ({region})")
+            assert region == 'page' and name == 'DUPONT Jean'
+        
+        # En-tête avec la ligne patient: la page entière n'est pas lue
+        processor = classifier.DocumentProcessor(None)
+        processor._engine = FakeOcrEngine([(50, "CABINET DE RADIOLOGIE"), (400, "Patient : DUPONT Jean")])
+        assert processor.ocr_image(page)[1] == 'header'
+    finally:
+        classifier.OCR_WORD_LEVEL = word_level
+    return True
+
+def test_name_followed_by_dob():
+    """Test 8: Nom et date de naissance sur la même ligne"""
+    print("\n" + "="*60)
+    print("TEST 8: « Patient : NOM Prénom né le JJ/MM/AAAA »")
+    print("="*60)
+    
+    from medistory_auto_classifier import DocumentProcessor
+    from patient_index import PatientMatcher
+    
+    processor = DocumentProcessor(None)
+    matcher = PatientMatcher([("1", "DUPONT", "Jean"), ("2", "DUPOND", "Jeanne", "01/02/1950")])
+    test_cases = [
+        ("Patient : DUPONT Jean né le 01/02/1950", "DUPONT Jean", "01/02/1950"),
+        ("Patient : DUPONT Jean, né le 01/02/1950", "DUPONT Jean", "01/02/1950"),
+        ("Patient : DUPONT Jean Né(e) le 1/2/1950", "DUPONT Jean", "1/2/1950"),
+        ("Nom : DUPONT Jean date de naissance : 01/02/1950", "DUPONT Jean", "01/02/1950"),
+        ("Patient : DUPONT née MARTIN Jeanne", "DUPONT née MARTIN Jeanne", None),
+    ]
+    for text, expected_name, expected_dob in test_cases:
+        name, dob = processor.extract_patient_identity(text)
+        print(f"{'✓' if (name, dob) == (expected_name, expected_dob) else '✗'} '{text}' → {name!r}, {dob!r}")
+        assert (name, dob) == (expected_name, expected_dob)
+    
+    # Le nom seul est comparé: correspondance exacte, pas de low_confidence
+    name, dob = processor.extract_patient_identity(test_cases[0][0])
+    (patient, confidence), = matcher.find_candidates(name, k=1, dob=dob)
+    assert patient[0] == "1" and confidence == 1.0
+    
+    # Homonymes départagés par la date: l'écart n'est plus nul
+    from types import SimpleNamespace
+    homonyms = PatientMatcher([("1", "DUPONT", "Jean", "03/04/1960"),
+                               ("2", "DUPONT", "Jean", "01/02/1950")])
+    processor = DocumentProcessor(SimpleNamespace(find_candidates=homonyms.find_candidates))
+    result = processor.identify(test_cases[0][0], 'text_layer')
+    print(f"{'✓' if result['patient_id'] == '2' and result['margin'] == 1.0 else '✗'} "
+          f"homonymes → {result['patient_id']} (écart: {result['margin']:.2f})")
+    assert result['patient_id'] == "2" and result['margin'] == 1.0
+    assert processor.identify("Patient : DUPONT Jean", 'text_layer')['margin'] == 0.0
+    return True
+
+def test_phonetic_recall():
+    """Test 9: Rappel du mode phonétique face aux trigrammes"""
+    print("\n" + "="*60)
+    print("TEST 9: Rappel phonétique vs trigrammes (erreurs OCR)")
+    print("="*60)
+    
+    import random
+    sys.path.insert(0, str(Path(__file__).parent / "test_env"))
+    from benchmark_matching import generate_patients, ocr_typo
+    from patient_index import PatientMatcher
+    
+    # Base synthétique: seaux phonétiques plus grands que la limite de candidats
+    rng = random.Random(7)
+    patients = generate_patients(5_000, rng)
+    queries = [(ocr_typo(f"{p[1]} {p[2]}", rng), p[0]) for p in rng.sample(patients, 200)]
+    
+    recall = {}
+    for mode in ('ngram', 'phonetic'):
+        matcher = PatientMatcher(patients, mode=mode)
+        recall[mode] = sum(1 for query, expected_id in queries
+                           if (found := matcher.find_candidates(query, k=1))
+                           and found[0][0][0] == expected_id)
+        print(f"  {mode:10} {recall[mode]}/{len(queries)}")
+    
+    assert recall['phonetic'] >= recall['ngram']
+    
+    # Seau ROBP tronqué: ROBPE (0.92) ne doit pas masquer ROBPELAU
+    matcher = PatientMatcher([("1", "ROBPE", "Pierre"), ("2", "ROBPELAU", "Pierre")]
+                             + [(str(i), "ROBP" + s, "Pierre") for i, s in enumerate(
+                                 ["A", "I", "O", "U", "Y", "ET", "ES", "EZ"] * 10, start=3)],
+                             mode='phonetic')
+    (patient, confidence), = matcher.find_candidates("ROBPEAU Pierre", k=1)
+    print(f"{'✓' if patient[0] == '2' else '✗'} 'ROBPEAU Pierre' → {patient[1]} ({confidence:.2f})")
+    assert patient[0] == "2"
+    return True
+
+def test_patient_refresh():
+    """Test 10: Rafraîchissement de la base patients SQLite"""
+    print("\n" + "="*60)
+    print("TEST 10: Rafraîchissement des patients (SQLite)")
+    print("="*60)
+    
+    import sqlite3
+    import tempfile
+    from unittest import mock
+    import medistory_auto_classifier as classifier
+    from patient_index import load_index
+    
+    with tempfile.TemporaryDirectory() as folder:
+        db_path = os.path.join(folder, "medistory.db")
+        settings = dict(INDEX_CACHE_FILE=os.path.join(folder, "patients.idx"),
+                        FTS_INDEX_FILE=os.path.join(folder, "patients_fts.db"),
+                        ALIAS_DB_FILE=os.path.join(folder, "alias.db"),
+                        PATIENT_LIST_FILE=os.path.join(folder, "absent.txt"))
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE patients (id INTEGER PRIMARY KEY, nom TEXT, prenom TEXT)")
+        conn.executemany("INSERT INTO patients (nom, prenom) VALUES (?, ?)",
+                         [("DUPONT", "Jean"), ("MARTIN", "Marie")])
+        conn.commit()
+        
+        for backend in ('memory', 'fts'):
+            with mock.patch.multiple(classifier, PATIENT_BACKEND=backend, **settings):
+                db = classifier.PatientDatabase(db_path)
+                assert db.find_patient("NOUVEAU Paul") is None
+                
+                # Ajout: seul le nouveau patient est lu
+                conn.execute("INSERT INTO patients (nom, prenom) VALUES ('NOUVEAU', 'Paul')")
+                conn.commit()
+                assert db.refresh()
+                assert db.find_patient("NOUVEAU Paul")[1] == "NOUVEAU"
+                assert not db.refresh()
+                
+                # Modification d'une ligne déjà chargée: index reconstruit
+                conn.execute("UPDATE patients SET nom = 'DURAND' WHERE nom = 'DUPONT'")
+                conn.commit()
+                assert db.refresh()
+                assert db.find_patient("DURAND Jean")[1] == "DURAND"
+                
+                # Alias appris: résolu sans passer par le matching flou
+                patient = db.find_patient("MARTIN Marie")[:3]
+                db.aliases.add("MRTN Mrie", patient)
+                assert db.find_candidates("MRTN Mrie") == [(patient, 1.0)]
+                db.aliases.remove("MRTN Mrie")
+                
+                # Cache LRU: même date de naissance sous deux écritures
+                db.find_candidates("MARTIN Marie", dob="1/2/1950")
+                hits = db.lookup_cache.stats['hits']
+                db.find_candidates("MARTIN Marie", dob="01/02/1950")
+                assert db.lookup_cache.stats['hits'] == hits + 1
+                
+                # Index persistant réécrit à l'arrêt, pas à chaque rafraîchissement
+                if backend == 'memory':
+                    signature = db._database_signature(db._db_state)
+                    assert load_index(settings['INDEX_CACHE_FILE'], signature) is None
+                db.stop_refresher()
+                if backend == 'memory':
+                    assert load_index(settings['INDEX_CACHE_FILE'], signature) is not None
+                print(f"✓ {backend}: ajout, modification et alias pris en compte")
+                
+                conn.execute("DELETE FROM patients WHERE nom = 'NOUVEAU'")
+                conn.execute("UPDATE patients SET nom = 'DUPONT' WHERE nom = 'DURAND'")
+                conn.commit()
+        
+        # SQLite sans tokenizer trigram (< 3.34): repli sur l'index en mémoire
+        error = sqlite3.OperationalError("no such tokenizer: trigram")
+        with mock.patch.multiple(classifier, PATIENT_BACKEND='fts', **settings), \
+                mock.patch.object(classifier.FtsPatientIndex, '_connection', side_effect=error):
+            db = classifier.PatientDatabase(db_path)
+            assert db.backend == 'memory' and not isinstance(db.matcher, classifier.FtsPatientIndex)
+            assert db.find_patient("MARTIN Marie")[1] == "MARTIN"
+            print("✓ FTS5 trigram indisponible: index en mémoire")
+        
+        # Nom corrigé sans changer la taille ni la date de la base: l'index
+        # persistant n'est plus servi au redémarrage
+        with mock.patch.multiple(classifier, PATIENT_BACKEND='memory', **settings):
+            classifier.PatientDatabase(db_path).stop_refresher()
+            stat = os.stat(db_path)
+            conn.execute("UPDATE patients SET nom = 'DUPOND' WHERE nom = 'DUPONT'")
+            conn.commit()
+            os.utime(db_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            assert os.stat(db_path).st_size == stat.st_size
+            db = classifier.PatientDatabase(db_path)
+            assert db.find_patient("DUPOND Jean")[1] == "DUPOND"
+            print("✓ Index persistant périmé reconstruit au chargement")
+        conn.close()
+    return True
+
+def test_persistent_index():
+    """Test 11: Sauvegarde et rechargement de l'index dans chaque mode"""
+    print("\n" + "="*60)
+    print("TEST 11: Index persistant (save_index / load_index)")
+    print("="*60)
+    
+    import random
+    import tempfile
+    sys.path.insert(0, str(Path(__file__).parent / "test_env"))
+    from benchmark_matching import generate_patients, ocr_typo
+    from patient_index import PatientMatcher, MATCHING_MODES, save_index, load_index
+    
+    rng = random.Random(3)
+    patients = generate_patients(520, rng)
+    queries = [f"{p[1]} {p[2]}" for p in rng.sample(patients, 40)]
+    queries += [ocr_typo(query, rng) for query in queries]
+    
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "patients.idx")
+        for mode in MATCHING_MODES:
+            matcher = PatientMatcher(patients[:500], mode=mode)
+            save_index(matcher, path, "sig-1")
+            loaded = load_index(path, "sig-1", mode=mode)
+            assert loaded is not None
+            for query in queries:
+                expected = matcher.find_candidates(query, k=3)
+                found = loaded.find_candidates(query, k=3)
+                assert [score for _, score in found] == [score for _, score in expected], query
+            
+            # Ajouts par couche, sauvegardés puis relus
+            extended = loaded.extended(patients[500:])
+            save_index(extended, path, "sig-2")
+            reloaded = load_index(path, "sig-2", mode=mode)
+            full = PatientMatcher(patients, mode=mode)
+            for query in queries:
+                expected = full.find_candidates(query, k=3)
+                found = reloaded.find_candidates(query, k=3)
+                assert [score for _, score in found] == [score for _, score in expected], query
+            
+            # Fichier d'une autre source: jamais servi
+            assert load_index(path, "sig-1", mode=mode) is None
+            print(f"✓ {mode}: rechargé à l'identique, signature périmée rejetée")
+        
+        # Identifiants entiers et texte mélangés: chacun garde son type
+        mixed = PatientMatcher([(1, "DUPONT", "Jean"), ("A2", "MARTIN", "Marie")])
+        save_index(mixed, path, "sig-mixed")
+        loaded = load_index(path, "sig-mixed")
+        assert list(loaded.patients) == [(1, "DUPONT", "Jean"), ("A2", "MARTIN", "Marie")]
+        assert loaded.find("DUPONT Jean")[0] == 1 and loaded.find_by_id(1, "DUPONT Jean")
+        print("✓ Identifiants entiers et texte conservés")
+        
+        # Index sans la structure du mode demandé: rejeté
+        save_index(PatientMatcher(patients, mode='ngram'), path, "sig-3")
+        assert load_index(path, "sig-3", mode='tokens') is None
+        with open(path, 'r+b') as f:
+            f.write(b"corrompu")
+        try:
+            loaded = load_index(path, "sig-3")
+        except Exception:
+            loaded = None
+        assert loaded is None
+        print("✓ Index d'un autre mode ou corrompu rejeté")
+    return True
+
 def main():
     print("\n" + "#"*60)
     print("#" + " "*58 + "#")
@@ -276,6 +570,11 @@ def main():
         ("Matching patients", test_patient_matching),
         ("Surveillance fichiers", test_file_watching),
         ("Document réel", test_with_real_document),
+        ("En-tête en majuscules", test_header_letterhead),
+        ("Nom suivi de la date", test_name_followed_by_dob),
+        ("Rappel phonétique", test_phonetic_recall),
+        ("Rafraîchissement des patients", test_patient_refresh),
+        ("Index persistant", test_persistent_index),
     ]
     
     results = []